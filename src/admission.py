@@ -0,0 +1,142 @@
+"""Size-aware TinyLFU admission for the Redis tier of the audio cache"""
+
+import hashlib
+import logging
+import os
+
+from redis import asyncio as aioredis
+
+log = logging.getLogger(__name__)
+
+# Count-min sketch of how often each video is requested, stored as a Redis string of
+# 4-bit saturating counters (SKETCH_DEPTH rows of SKETCH_WIDTH counters, 128 KiB in total)
+SKETCH_KEY = "cache:sketch"
+SKETCH_WIDTH = 1 << 16
+SKETCH_DEPTH = 4
+
+# Number of requests recorded before every counter is halved, so that popularity decays
+SKETCH_SAMPLE_SIZE = 10 * SKETCH_WIDTH
+SKETCH_OPS_KEY = "cache:sketch:ops"
+
+# Sorted set of the videos held in Redis, scored by size, from which victims are sampled
+INDEX_KEY = "cache:videos"
+
+# Number of cached videos compared against each candidate for admission
+VICTIM_SAMPLE = 8
+
+# Tracks larger than this are never stored in Redis (they still live on the disk tier)
+MAX_OBJECT_SIZE = int(os.getenv("CACHE_MAX_OBJECT_MB", "20")) * 1024 * 1024
+
+# Halves both 4-bit counters packed in a byte
+_HALVE = bytes((b >> 1) & 0x77 for b in range(256))
+
+
+class FrequencySketch:
+    """Approximate request counts per video, shared by every process using the cache"""
+
+    def __init__(self, redis: aioredis.Redis):
+        self.redis = redis
+
+    @staticmethod
+    def _counters(video_id: str) -> list[str]:
+        """BITFIELD offsets of the video's counter in each row"""
+        digest = hashlib.blake2b(video_id.encode(), digest_size=4 * SKETCH_DEPTH).digest()
+        return [
+            f"#{row * SKETCH_WIDTH + int.from_bytes(digest[row * 4 : row * 4 + 4]) % SKETCH_WIDTH}"
+            for row in range(SKETCH_DEPTH)
+        ]
+
+    async def increment(self, video_id: str):
+        args = ["OVERFLOW", "SAT"]
+        for offset in self._counters(video_id):
+            args += ["INCRBY", "u4", offset, 1]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.execute_command("BITFIELD", SKETCH_KEY, *args)
+            pipe.incr(SKETCH_OPS_KEY)
+            _, ops = await pipe.execute()
+        if ops >= SKETCH_SAMPLE_SIZE:
+            await self._age()
+
+    async def estimate(self, *video_ids: str) -> list[int]:
+        """Estimated request count of each video (the minimum of its counters)"""
+        if not video_ids:
+            return []
+        args = []
+        for video_id in video_ids:
+            for offset in self._counters(video_id):
+                args += ["GET", "u4", offset]
+        counts = await self.redis.execute_command("BITFIELD_RO", SKETCH_KEY, *args)
+        return [min(counts[i : i + SKETCH_DEPTH]) for i in range(0, len(counts), SKETCH_DEPTH)]
+
+    async def _age(self):
+        """Halve every counter (TinyLFU's reset), so old popularity fades out"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.get(SKETCH_KEY)
+            pipe.set(SKETCH_OPS_KEY, 0)
+            sketch, _ = await pipe.execute()
+        if sketch:
+            # Requests recorded between the read & write are lost, which the sketch tolerates
+            await self.redis.set(SKETCH_KEY, sketch.translate(_HALVE))
+        log.info("Aged cache frequency sketch")
+
+
+class AdmissionPolicy:
+    """Decides whether a track is worth storing in Redis, and what it should displace
+
+    While Redis has room, everything up to :data:`MAX_OBJECT_SIZE` is admitted. Once it is
+    full, a few cached tracks are sampled and the least requested are picked as victims
+    until they free enough memory for the candidate. The candidate is only admitted if it
+    has been requested more often than all of those victims put together, so one large,
+    rarely played track can't push out many popular ones.
+    """
+
+    def __init__(self, redis: aioredis.Redis):
+        self.redis = redis
+        self.sketch = FrequencySketch(redis)
+
+    async def record(self, video_id: str):
+        """Record a request for a video, whether or not it is cached"""
+        await self.sketch.increment(video_id)
+
+    async def admit(self, video_id: str, size: int) -> list[str] | None:
+        """Decide whether to store a track of ``size`` bytes in Redis
+
+        :returns: Videos to evict from Redis to make room (possibly none), or ``None`` if the
+            track should not be stored
+        """
+        if size > MAX_OBJECT_SIZE:
+            log.info(f"Not admitting video {video_id} to Redis: {size / 1024 / 1024:.1f} MB")
+            return None
+
+        memory = await self.redis.info("memory")
+        excess = memory["used_memory"] + size - memory["maxmemory"]
+        if not memory["maxmemory"] or excess <= 0:
+            return []
+
+        # Without a response callback (RESP2), members & scores come back as one flat list
+        sample = await self.redis.zrandmember(INDEX_KEY, VICTIM_SAMPLE, withscores=True) or []
+        sample = [
+            (victim.decode(), int(float(victim_size)))
+            for victim, victim_size in zip(sample[::2], sample[1::2], strict=True)
+        ]
+        frequency, *frequencies = await self.sketch.estimate(
+            video_id, *(victim for victim, _ in sample)
+        )
+
+        victims, freed, victims_frequency = [], 0, 0
+        for (victim, victim_size), victim_frequency in sorted(
+            zip(sample, frequencies, strict=True), key=lambda pair: pair[1]
+        ):
+            if freed >= excess:
+                break
+            victims.append(victim)
+            freed += victim_size
+            victims_frequency += victim_frequency
+
+        if freed < excess or frequency <= victims_frequency:
+            log.info(
+                f"Not admitting video {video_id} to Redis: requested {frequency} times, "
+                f"would displace {len(victims)} tracks requested {victims_frequency} times"
+            )
+            return None
+        return victims
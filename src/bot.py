@@ -3,7 +3,7 @@ import logging
 from typing import cast
 
 from discord import (
-    Client,
+    AutoShardedClient,
     Intents,
     Interaction,
     Message,
@@ -16,19 +16,23 @@ from src.activities import Activities
 from src.cogs.dashboard.cog import DashboardCog
 from src.cogs.dashboard.views import DashboardView
 from src.database import Database
+from src.metrics import start_server as start_metrics_server
 from src.reloader import CogReloader
+from src.sharding import SHARD_COUNT, shard_ids_from_env
 
 log = logging.getLogger(__name__)
 
 
-class QuartzBot(Client):
-    def __init__(self):
+class QuartzBot(AutoShardedClient):
+    def __init__(self, shard_ids: list[int] | None = None, shard_count: int | None = SHARD_COUNT):
         intents = Intents.default()
         intents.message_content = True
         intents.messages = True
         intents.voice_states = True
 
-        super().__init__(intents=intents)
+        # Connects every shard unless given a subset (when run as one of several processes)
+        shard_ids = shard_ids or shard_ids_from_env()
+        super().__init__(intents=intents, shard_ids=shard_ids, shard_count=shard_count)
 
         # Create the command tree for slash commands
         self.tree = app_commands.CommandTree(self)
@@ -39,6 +43,9 @@ class QuartzBot(Client):
         # Initialise database
         self.db = Database(self)
 
+        # Serves /metrics once started
+        self.metrics_runner = None
+
     async def setup_hook(self):
         """Called when the bot is starting up"""
         log.info(f"Logged in as [bold bright_green]{self.user}[/] (ID: {self.user.id})")
@@ -54,6 +61,13 @@ class QuartzBot(Client):
             log.info("Adding dashboard view...")
             self.add_view(DashboardView(self))
 
+        # Warm the cache with the most played tracks in the background (once, for all shards)
+        if self.is_primary and (music_cog := self.reloader.cogs.get("music")):
+            music_cog.warmer.start()
+
+        # Expose cache metrics for scraping
+        self.metrics_runner = await start_metrics_server()
+
         # Start watching for changes
         asyncio.create_task(self.reloader.start_watching())
 
@@ -69,8 +83,26 @@ class QuartzBot(Client):
             log.info("Updating dashboard...")
             await dashboard_cog.dashboard_load()
 
+        # Resume any queues that were playing before the last shutdown
+        if music_cog := self.reloader.cogs.get("music"):
+            await music_cog.restore_players()
+
+    @property
+    def is_primary(self) -> bool:
+        """Whether this process does bot-wide jobs, when sharded across several processes"""
+        return self.shard_ids is None or 0 in self.shard_ids
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether the guild's shard is connected by this process"""
+        if self.shard_ids is None:
+            return True
+        return (guild_id >> 22) % self.shard_count in self.shard_ids
+
     async def sync_commands(self):
         """Sync commands to all guilds the bot is in"""
+        if not self.is_primary:
+            return  # Commands are global, so only one process needs to sync them
+
         total_commands = len(list(self.tree.walk_commands()))
 
         log.info("Syncing commands...")
@@ -1,87 +1,812 @@
+import asyncio
+import io
 import logging
-import os
+import math
 import time
-from collections.abc import Awaitable
-from typing import Any
+from collections.abc import AsyncIterator, Awaitable, Callable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from itertools import batched
+from pathlib import Path
+from typing import Any, BinaryIO
 
-import redis
+from redis import asyncio as aioredis
+from redis.exceptions import ResponseError
+
+from src.admission import INDEX_KEY, MAX_OBJECT_SIZE, AdmissionPolicy
+from src.disk_cache import DiskCache, DiskEntry, DiskInbox, DiskWriter, get_disk_cache
+from src.loudness import Loudness
+from src.metadata import MetadataCache
+from src.metrics import (
+    CACHE_ADMISSIONS,
+    CACHE_BYTES_READ,
+    CACHE_BYTES_WRITTEN,
+    CACHE_EVICTIONS,
+    CACHE_LOOKUPS,
+    CACHE_OOM_RETRIES,
+    REDIS_LATENCY,
+)
+from src.seek_index import SeekIndex, SeekIndexBuilder
+from src.streaming import (
+    ABORTED,
+    DONE,
+    WRITING,
+    StreamReader,
+    StreamState,
+    get_stream_watcher,
+    publish,
+)
 
 log = logging.getLogger(__name__)
 
+REDIS_HOST = "quartzbot-redict"
+REDIS_PORT = 6379
+REDIS_MAX_CONNECTIONS = 32
 
-class AudioCache:
-    def __init__(self):
-        self.redis = redis.Redis(
-            host="quartzbot-redict",
-            port=6379,
-            decode_responses=False,  # For binary data
+# Audio is stored as fixed-size chunks so that ingest & playback memory is independent of length
+CHUNK_SIZE = 512 * 1024
+
+# Number of chunks fetched per round trip when reading audio back
+READ_AHEAD = 4
+
+# Tracks are transcoded to Ogg Opus when cached, so they can be sent to Discord as-is
+OPUS_MIME_TYPE = "audio/ogg"
+
+# File extensions for each container format tracks may be cached in
+EXTENSIONS = {"audio/mp4": "m4a", "audio/webm": "webm", OPUS_MIME_TYPE: "ogg"}
+
+# How long a blocking reader waits for a chunk to arrive from Redis before giving up
+READ_TIMEOUT = 10
+
+# Initial delay before retrying a write rejected by Redis with OOM, doubled on each attempt
+OOM_BACKOFF = 0.25
+
+# Sorted set of every cached video (on either tier), scored by when it was cached
+ADDED_KEY = "cache:videos:added"
+
+# Number of videos (and at most keys, for scans) handled per round trip by bulk operations
+BATCH_SIZE = 100
+
+_pool: aioredis.ConnectionPool | None = None
+
+
+def get_pool() -> aioredis.ConnectionPool:
+    """Get the shared Redis connection pool, creating it on first use
+
+    The pool lives at module level so that reloading a cog (and with it, creating a new
+    :class:`AudioCache`) reuses the existing connections rather than leaking them.
+    """
+    global _pool
+    if _pool is None:
+        _pool = aioredis.ConnectionPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            decode_responses=False,  # For binary data, strings are decoded by hand
         )
-        # Separate client for string data
-        self.redis_str = redis.Redis(
-            host="quartzbot-redict",
-            port=6379,
-            decode_responses=True,  # For string data
+    return _pool
+
+
+async def close_pool():
+    """Disconnect all pooled Redis connections"""
+    global _pool
+    if _pool is not None:
+        await _pool.disconnect()
+        _pool = None
+
+
+class ChunkMissingError(Exception):
+    """Raised when cached audio (or part of it) is no longer in the cache"""
+
+
+@dataclass
+class AudioManifest:
+    """Describes how a track's audio is laid out in the cache"""
+
+    size: int
+    chunk_size: int
+    chunks: int
+    mime_type: str | None = None
+    tier: str = "redis"
+
+    @classmethod
+    def from_redis(cls, data: dict[bytes, bytes]) -> "AudioManifest | None":
+        if not data:
+            return None
+        return cls(
+            size=int(data[b"size"]),
+            chunk_size=int(data[b"chunk_size"]),
+            chunks=int(data[b"chunks"]),
+            mime_type=data[b"mime_type"].decode() if data.get(b"mime_type") else None,
+        )
+
+    @classmethod
+    def for_file(cls, size: int, extension: str) -> "AudioManifest":
+        """Manifest for a track held as a single file (e.g. on the disk tier)"""
+        mime_type = next((m for m, e in EXTENSIONS.items() if e == extension), None)
+        return cls(
+            size=size,
+            chunk_size=CHUNK_SIZE,
+            chunks=math.ceil(size / CHUNK_SIZE),
+            mime_type=mime_type,
+            tier="disk",
         )
 
-        self.temp_dir = "/tmp/audio"
-        os.makedirs(self.temp_dir, exist_ok=True)
+    @property
+    def extension(self) -> str:
+        """File extension matching the cached container format"""
+        return EXTENSIONS.get(self.mime_type, "m4a")
+
+    @property
+    def is_opus(self) -> bool:
+        """Whether the audio is Ogg Opus, and can be played without re-encoding"""
+        return self.mime_type == OPUS_MIME_TYPE
+
+    def to_redis(self) -> dict[str, str | int]:
+        data = {"size": self.size, "chunk_size": self.chunk_size, "chunks": self.chunks}
+        if self.mime_type:
+            data["mime_type"] = self.mime_type
+        return data
+
+
+class AudioCache:
+    """Two-tier audio cache: a local disk LRU in front of the shared Redis cache
+
+    Tracks are written to both tiers on ingest. A Redis hit promotes the track to disk in the
+    background, and a track evicted from disk is demoted back to Redis if Redis no longer has
+    it, so the local hot set can be far larger than Redis' memory limit. Writes to Redis are
+    subject to an :class:`AdmissionPolicy`, which keeps it for the most requested tracks.
+
+    Ingest workers use a :class:`DiskInbox` as their disk tier instead, which bot processes
+    (handing downloads to them) adopt tracks from into their own disk cache on lookup.
+    """
+
+    def __init__(
+        self,
+        pool: aioredis.ConnectionPool | None = None,
+        disk: DiskCache | DiskInbox | None = None,
+    ):
+        self.redis = aioredis.Redis(connection_pool=pool or get_pool())
+        self.disk = disk if disk is not None else get_disk_cache()
+        self.metadata = MetadataCache(self.redis)
+        self.admission = AdmissionPolicy(self.redis)
+        self.streams = get_stream_watcher(self.redis)
+        self._promoting: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
 
-    def get_audio(self, video_id: str) -> Awaitable[Any] | None:
-        """Get cached audio data & title if it exists"""
-        audio_data = self.redis.get(f"video:{video_id}:audio")
-        if audio_data:
-            log.info(f"[bright_green]Cache hit for video {video_id}[/]")
+    async def get(self, video_id: str) -> tuple[AudioManifest | None, str | None]:
+        """Get cached audio manifest & title in a single round trip"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(f"video:{video_id}:manifest")
+            pipe.get(f"video:{video_id}:title")
+            manifest, title = await pipe.execute()
+        self._spawn(self.admission.record(video_id))
+
+        manifest = await self._lookup(video_id, AudioManifest.from_redis(manifest))
+        if manifest:
+            log.info(f"[bright_green]Cache hit for video {video_id} ({manifest.tier})[/]")
         else:
             log.info(f"[yellow]Cache miss for video {video_id}[/]")
-        return audio_data
+        return manifest, title.decode() if title else None
+
+    async def get_manifest(self, video_id: str) -> AudioManifest | None:
+        """Get the manifest of cached audio if it exists"""
+        if entry := self.disk.get(video_id):
+            CACHE_LOOKUPS.inc("disk")
+            return AudioManifest.for_file(entry.size, entry.extension)
+        manifest = await self.redis.hgetall(f"video:{video_id}:manifest")
+        return await self._lookup(video_id, AudioManifest.from_redis(manifest))
+
+    async def _lookup(
+        self, video_id: str, redis_manifest: AudioManifest | None
+    ) -> AudioManifest | None:
+        """Pick the tier to serve a track from, promoting Redis hits to disk"""
+        if entry := await self._disk_entry(video_id):
+            CACHE_LOOKUPS.inc("disk")
+            return AudioManifest.for_file(entry.size, entry.extension)
+        if redis_manifest:
+            CACHE_LOOKUPS.inc("redis")
+            self._spawn(self._promote(video_id, redis_manifest))
+        else:
+            CACHE_LOOKUPS.inc("miss")
+        return redis_manifest
 
-    def get_title(self, video_id: str) -> str | None:
+    async def _disk_entry(self, video_id: str) -> DiskEntry | None:
+        """Look a track up on disk, adopting it if an ingest worker left it in the inbox"""
+        if entry := self.disk.get(video_id):
+            return entry
+        if self.disk.inbox is None:
+            return None  # Not handing downloads to ingest workers
+        evicted = await asyncio.to_thread(self.disk.adopt, video_id)
+        if evicted is None:
+            return None
+        self._demote_all(evicted)
+        return self.disk.get(video_id)
+
+    async def get_title(self, video_id: str) -> str | None:
         """Get cached title if it exists"""
-        return self.redis_str.get(f"video:{video_id}:title")
+        title = await self.redis.get(f"video:{video_id}:title")
+        return title.decode() if title else None
 
-    def cache_audio(self, video_id: str, audio_data: bytes, max_retries: int = 3):
-        """Cache audio data with automatic LRU eviction"""
-        for attempt in range(max_retries):
-            try:
-                self.redis.set(f"video:{video_id}:audio", value=audio_data)
-                log.info(f"Cached audio for video {video_id}")
+    def open_writer(
+        self,
+        video_id: str,
+        mime_type: str | None = None,
+        expected_size: int | None = None,
+        progressive: bool = False,
+    ) -> "AudioWriter":
+        """Open a writer that streams audio into the cache chunk by chunk
+
+        Use as an async context manager, calling :meth:`AudioWriter.commit` once all data has
+        been written. Chunks are discarded if the block exits without committing.
+
+        :param expected_size: Estimated size of the audio, used to decide up front whether it
+            is admitted to Redis
+        :param progressive: Announce each chunk written, for a player to follow the write
+            (see :meth:`AudioWriter.make_progressive`)
+        """
+        return AudioWriter(self, video_id, mime_type, expected_size, progressive=progressive)
+
+    def open_reader(
+        self,
+        video_id: str,
+        manifest: AudioManifest,
+        loop: asyncio.AbstractEventLoop,
+        seek_index: SeekIndex | None = None,
+        seconds: float = 0.0,
+    ) -> "CacheReader":
+        """Open a blocking, file-like reader over cached audio (e.g. for an FFmpeg stdin pipe)
+
+        With a seek index, the reader starts from the indexed page at or before ``seconds``
+        (see :attr:`CacheReader.start_time`), without reading anything in between.
+        """
+        if seek_index and seconds > 0:
+            start, start_time = seek_index.locate(seconds)
+            return CacheReader(
+                self, video_id, manifest, loop, seek_index.header_size, start, start_time
+            )
+        return CacheReader(self, video_id, manifest, loop)
+
+    async def get_loudness(self, video_id: str) -> Loudness | None:
+        """Get the loudness of a cached track (after any levelling), if it was measured"""
+        return Loudness.from_redis(await self.redis.hgetall(f"video:{video_id}:loudness"))
+
+    async def get_seek_index(self, video_id: str) -> SeekIndex | None:
+        """Get the index of where each second of a cached Ogg Opus track starts, if it has one"""
+        data = await self.redis.get(f"video:{video_id}:seek")
+        return SeekIndex.from_bytes(data) if data else None
+
+    def open_stream(
+        self, video_id: str, state: StreamState, loop: asyncio.AbstractEventLoop
+    ) -> StreamReader:
+        """Open a blocking, file-like reader over audio that's still being written
+
+        :raises FileNotFoundError: If the write was committed since ``state`` was read
+        """
+        return StreamReader(self.streams, video_id, state, loop)
+
+    async def read_chunk(self, video_id: str, index: int) -> bytes:
+        """Read a single chunk of cached audio
+
+        :raises ChunkMissingError: If the chunk was evicted
+        """
+        start = index * CHUNK_SIZE
+        if video_id in self.disk:
+            chunk = await asyncio.to_thread(self.disk.read, video_id, start, start + CHUNK_SIZE)
+            if chunk is not None:
+                CACHE_BYTES_READ.inc("disk", amount=len(chunk))
+                return chunk
+
+        with REDIS_LATENCY.time("get"):
+            chunk = await self.redis.get(f"video:{video_id}:chunk:{index}")
+        if chunk is None:
+            raise ChunkMissingError(f"Chunk {index} of video {video_id} was evicted")
+        CACHE_BYTES_READ.inc("redis", amount=len(chunk))
+        return chunk
+
+    async def read_range(
+        self,
+        video_id: str,
+        start: int = 0,
+        end: int | None = None,
+        manifest: AudioManifest | None = None,
+    ) -> bytes:
+        """Read the byte range ``[start, end)`` of cached audio, fetching only the chunks needed
+
+        :raises ChunkMissingError: If the audio is not cached, or part of it was evicted
+        """
+        return b"".join([part async for part in self.iter_audio(video_id, start, end, manifest)])
+
+    async def iter_audio(
+        self,
+        video_id: str,
+        start: int = 0,
+        end: int | None = None,
+        manifest: AudioManifest | None = None,
+    ) -> AsyncIterator[bytes]:
+        """Iterate over the byte range ``[start, end)`` of cached audio
+
+        At most :data:`READ_AHEAD` chunks are held in memory at once, regardless of track length.
+
+        :raises ChunkMissingError: If the audio is not cached, or part of it was evicted
+        """
+        manifest = manifest or await self.get_manifest(video_id)
+        if not manifest:
+            raise ChunkMissingError(f"Audio for video {video_id} is not cached")
+
+        end = manifest.size if end is None else min(end, manifest.size)
+        if start >= end:
+            return
+
+        first, last = start // manifest.chunk_size, (end - 1) // manifest.chunk_size
+        if video_id in self.disk:
+            # Read straight from the mapped file, in pieces the same size as a Redis batch
+            for offset in range(start, end, READ_AHEAD * manifest.chunk_size):
+                data = await asyncio.to_thread(
+                    self.disk.read, video_id, offset, min(offset + READ_AHEAD * CHUNK_SIZE, end)
+                )
+                if data is None:
+                    break  # Evicted from disk mid-read, carry on from Redis
+                CACHE_BYTES_READ.inc("disk", amount=len(data))
+                yield data
+                start = offset + len(data)
+            else:
                 return
-            except redis.exceptions.ResponseError as e:
-                if "OOM command not allowed" in str(e):
-                    log.info(
-                        f"Cache full, attempt {attempt + 1}/{max_retries}, waiting for eviction..."
+            first = start // manifest.chunk_size
+
+        for batch_start in range(first, last + 1, READ_AHEAD):
+            indices = range(batch_start, min(batch_start + READ_AHEAD, last + 1))
+            with REDIS_LATENCY.time("mget"):
+                chunks = await self.redis.mget([f"video:{video_id}:chunk:{i}" for i in indices])
+            for index, chunk in zip(indices, chunks, strict=True):
+                if chunk is None:
+                    raise ChunkMissingError(f"Chunk {index} of video {video_id} was evicted")
+                CACHE_BYTES_READ.inc("redis", amount=len(chunk))
+                offset = index * manifest.chunk_size
+                yield chunk[max(start - offset, 0) : end - offset]
+
+    async def touch(self, video_id: str, manifest: AudioManifest) -> bool:
+        """Mark cached audio as recently used so LRU eviction passes over it
+
+        :returns: Whether every chunk is still cached (``False`` if some were already evicted)
+        """
+        if video_id in self.disk:
+            await asyncio.to_thread(self.disk.touch, video_id)
+            return True
+        keys = [f"video:{video_id}:manifest", *self._chunk_keys(video_id, manifest)]
+        return await self.redis.touch(*keys) == len(keys)
+
+    async def evict(self, *video_ids: str, redis_only: bool = False, reason: str = "manual"):
+        """Remove tracks' audio (and titles) from the cache
+
+        Works through :data:`BATCH_SIZE` tracks per round trip, removing keys with ``UNLINK``
+        so that Redis frees the memory in the background rather than blocking on it.
+
+        :param redis_only: Only remove the audio from Redis (e.g. to make room for a newly
+            admitted track), leaving the disk tier & title alone
+        """
+        for batch in batched(video_ids, BATCH_SIZE):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for video_id in batch:
+                    pipe.hgetall(f"video:{video_id}:manifest")
+                manifests = await pipe.execute()
+
+            keys = []
+            for video_id, manifest in zip(batch, manifests, strict=True):
+                keys.append(f"video:{video_id}:manifest")
+                if not redis_only:
+                    keys += (
+                        f"video:{video_id}:title",
+                        f"video:{video_id}:seek",
+                        f"video:{video_id}:loudness",
                     )
-                    # Give Redis a moment to evict keys
-                    time.sleep(0.5)
-                    continue
-                raise  # Re-raise other Redis errors
+                if manifest := AudioManifest.from_redis(manifest):
+                    keys += self._chunk_keys(video_id, manifest)
 
-        raise Exception(
-            f"Failed to cache audio after {max_retries} attempts - cache may be too full"
-        )
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.unlink(*keys)
+                pipe.zrem(INDEX_KEY, *batch)
+                if not redis_only:
+                    pipe.zrem(ADDED_KEY, *batch)
+                await pipe.execute()
+            if not redis_only:
+                for video_id in batch:
+                    await asyncio.to_thread(self.disk.remove, video_id)
+
+        CACHE_EVICTIONS.inc("redis" if redis_only else "all", reason, amount=len(video_ids))
+        log.info(f"Evicted {len(video_ids)} tracks from {'Redis' if redis_only else 'cache'}")
+
+    @staticmethod
+    def _chunk_keys(video_id: str, manifest: AudioManifest) -> list[str]:
+        return [f"video:{video_id}:chunk:{i}" for i in range(manifest.chunks)]
+
+    async def _promote(self, video_id: str, manifest: AudioManifest):
+        """Copy a track from Redis to the disk tier"""
+        if video_id in self._promoting or video_id in self.disk:
+            return
+        if isinstance(self.disk, DiskInbox):
+            return  # Ingest workers never play tracks back, so have nothing to gain
+        self._promoting.add(video_id)
+        writer = await asyncio.to_thread(self.disk.open_writer, video_id, manifest.extension)
+        try:
+            async for data in self.iter_audio(video_id, manifest=manifest):
+                await asyncio.to_thread(writer.write, data)
+                CACHE_BYTES_WRITTEN.inc("disk", amount=len(data))
+            self._demote_all(await asyncio.to_thread(writer.commit))
+            log.info(f"Promoted video {video_id} to disk cache")
+        except ChunkMissingError as e:
+            await asyncio.to_thread(writer.abort)
+            log.info(f"Could not promote video {video_id} to disk cache: {e}")
+        except Exception:
+            await asyncio.to_thread(writer.abort)
+            raise
+        finally:
+            self._promoting.discard(video_id)
+
+    async def _demote(self, path: Path):
+        """Move a track evicted from disk into Redis, unless Redis still has it"""
+        video_id, extension = path.name.split(".")[:2]
+        try:
+            if not await self.redis.exists(f"video:{video_id}:manifest"):
+                mime_type = AudioManifest.for_file(0, extension).mime_type
+                size = path.stat().st_size
+                async with AudioWriter(
+                    self, video_id, mime_type, expected_size=size, tee_to_disk=False
+                ) as writer:
+                    # Check first, to skip reading a file that Redis won't admit anyway
+                    if not await writer.admit():
+                        log.info(f"Dropped video {video_id} evicted from disk cache")
+                        return
+                    with open(path, "rb") as f:
+                        while data := await asyncio.to_thread(f.read, CHUNK_SIZE):
+                            await writer.write(data)
+                    await writer.commit()
+                log.info(f"Demoted video {video_id} from disk cache to Redis")
+        finally:
+            path.unlink(missing_ok=True)
+
+    def _demote_all(self, paths: list[Path]):
+        if paths:
+            CACHE_EVICTIONS.inc("disk", "lru", amount=len(paths))
+        for path in paths:
+            self._spawn(self._demote(path))
 
-    def cache_title(self, video_id: str, title: str, max_retries: int = 3):
+    def _spawn(self, coro):
+        """Run a tier maintenance task in the background, logging any failure"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+
+        def on_done(task: asyncio.Task):
+            self._tasks.discard(task)
+            if not task.cancelled() and (e := task.exception()):
+                log.error(f"Cache maintenance task failed: {e}")
+
+        task.add_done_callback(on_done)
+
+    async def cache_title(self, video_id: str, title: str, max_retries: int = 3):
         """Cache title with automatic LRU eviction"""
+        await self._retry_on_oom(
+            lambda: self.redis.set(f"video:{video_id}:title", value=title),
+            f"title for video {video_id}",
+            max_retries,
+        )
+
+    @staticmethod
+    async def _retry_on_oom(
+        write: Callable[[], Awaitable[Any]], description: str, max_retries: int
+    ):
+        """Run a write, backing off (without blocking the event loop) while Redis is full"""
         for attempt in range(max_retries):
             try:
-                self.redis_str.set(f"video:{video_id}:title", value=title)
-                return
-            except redis.exceptions.ResponseError as e:
-                if "OOM command not allowed" in str(e):
-                    log.info(
-                        f"Cache full, attempt {attempt + 1}/{max_retries}, waiting for eviction..."
-                    )
-                    time.sleep(0.5)
-                    continue
-                raise
+                return await write()
+            except ResponseError as e:
+                if "OOM command not allowed" not in str(e):
+                    raise  # Re-raise other Redis errors
+                delay = OOM_BACKOFF * 2**attempt
+                CACHE_OOM_RETRIES.inc()
+                log.info(
+                    f"Cache full, attempt {attempt + 1}/{max_retries}, "
+                    f"waiting {delay:.2f}s for eviction..."
+                )
+                # Give Redis a moment to evict keys
+                await asyncio.sleep(delay)
 
         raise Exception(
-            f"Failed to cache title after {max_retries} attempts - cache may be too full"
+            f"Failed to cache {description} after {max_retries} attempts - cache may be too full"
+        )
+
+
+class AudioWriter:
+    """Streams audio into the cache as fixed-size chunks
+
+    Data is buffered only until a full chunk is available, then written straight to Redis
+    (and, unless disabled, to the disk tier). The manifest is written last on :meth:`commit`,
+    so readers never see a partial track.
+
+    Whether the track goes to Redis at all is decided by the cache's admission policy before
+    the first chunk is written. A track that outgrows :data:`MAX_OBJECT_SIZE` is dropped from
+    Redis part way, and carries on to disk only.
+
+    A progressive writer also announces each chunk it writes to disk, so that the track can be
+    played (through a :class:`StreamReader`) before it's committed.
+
+    Ogg Opus tracks get a :class:`SeekIndex` too, built from page headers as they're written and
+    stored alongside the track (whichever tier it ends up on) on commit.
+    """
+
+    def __init__(
+        self,
+        cache: AudioCache,
+        video_id: str,
+        mime_type: str | None = None,
+        expected_size: int | None = None,
+        tee_to_disk: bool = True,
+        progressive: bool = False,
+    ):
+        self.cache = cache
+        self.video_id = video_id
+        self.mime_type = mime_type
+        self.expected_size = expected_size
+        self.size = 0
+        self.chunks = 0
+        self.committed = False
+        self.progressive = progressive and tee_to_disk
+        self.to_redis: bool | None = None  # Undecided until the first chunk
+        self._buffer = bytearray()
+        self._seek_index = SeekIndexBuilder() if mime_type == OPUS_MIME_TYPE else None
+        self._disk: DiskWriter | None = None
+        if tee_to_disk:
+            self._disk = cache.disk.open_writer(video_id, EXTENSIONS.get(mime_type, "m4a"))
+
+    async def __aenter__(self) -> "AudioWriter":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if not self.committed:
+            await self.abort()
+
+    async def write(self, data: bytes):
+        """Append data, flushing every chunk that fills up"""
+        if self._seek_index:
+            self._seek_index.feed(data)
+        view = memoryview(data)
+        while view:
+            take = min(CHUNK_SIZE - len(self._buffer), len(view))
+            self._buffer += view[:take]
+            view = view[take:]
+            if len(self._buffer) == CHUNK_SIZE:
+                await self._flush()
+
+    def make_progressive(self):
+        """Start announcing chunks as they're written, e.g. once a player wants to follow along
+
+        Announcements cover everything written so far, as readers follow the file on disk.
+        """
+        self.progressive = self._disk is not None
+
+    async def admit(self) -> bool:
+        """Ask the admission policy whether the track is to be stored in Redis, if undecided"""
+        if self.to_redis is None:
+            victims = await self.cache.admission.admit(
+                self.video_id, self.expected_size or self.size + len(self._buffer)
+            )
+            if victims:
+                await self.cache.evict(*victims, redis_only=True, reason="admission")
+            self.to_redis = victims is not None
+            CACHE_ADMISSIONS.inc("admitted" if self.to_redis else "rejected")
+        return self.to_redis
+
+    async def commit(self, title: str | None = None, loudness: Loudness | None = None):
+        """Flush any remaining data and publish the manifest (and title & loudness)"""
+        if self._buffer:
+            await self._flush()
+
+        manifest = AudioManifest(
+            size=self.size, chunk_size=CHUNK_SIZE, chunks=self.chunks, mime_type=self.mime_type
         )
+        to_redis = await self.admit()
+        seek_index = self._seek_index.build() if self._seek_index else None
 
-    def clear_cache(self):
-        """Clear all cached data"""
-        for key in self.redis.scan_iter("audio:*"):
-            self.redis.delete(key)
-        for key in self.redis_str.scan_iter("title:*"):
-            self.redis_str.delete(key)
+        async def write():
+            async with self.cache.redis.pipeline(transaction=True) as pipe:
+                if to_redis:
+                    pipe.delete(f"video:{self.video_id}:manifest")
+                    pipe.hset(f"video:{self.video_id}:manifest", mapping=manifest.to_redis())
+                    pipe.zadd(INDEX_KEY, {self.video_id: self.size})
+                if title is not None:
+                    pipe.set(f"video:{self.video_id}:title", value=title)
+                if seek_index:
+                    pipe.set(f"video:{self.video_id}:seek", value=seek_index.to_bytes())
+                else:
+                    pipe.delete(f"video:{self.video_id}:seek")  # Left from an earlier write
+                if loudness:
+                    # Kept whichever tier the audio is on, as with the title
+                    pipe.hset(f"video:{self.video_id}:loudness", mapping=loudness.to_redis())
+                # Demotions keep the time the track was first cached
+                pipe.zadd(ADDED_KEY, {self.video_id: time.time()}, nx=self._disk is None)
+                await pipe.execute()
+
+        await self.cache._retry_on_oom(write, f"manifest for video {self.video_id}", 3)
+        if self._disk:
+            self.cache._demote_all(await asyncio.to_thread(self._disk.commit))
+        self.committed = True
+        await self._publish(DONE)
+        log.info(
+            f"Cached audio for video {self.video_id} "
+            f"({self.size / 1024 / 1024:.1f} MB in {self.chunks} chunks, "
+            f"{'Redis & disk' if to_redis and self._disk else 'Redis' if to_redis else 'disk'})"
+        )
+
+    async def open_written(self) -> BinaryIO:
+        """Flush any remaining data and open everything written (on disk), e.g. to re-encode it
+
+        The file stays readable through the returned handle after the write is aborted.
+        """
+        if self._buffer:
+            await self._flush()
+        return open(self._disk.path, "rb")
+
+    async def abort(self, state: str = ABORTED):
+        """Discard every chunk written so far
+
+        :param state: Announced to progressive readers, which play on up to the last chunk
+            announced either way (``DONE`` when the write is complete, but being replaced)
+        """
+        if self._disk:
+            await asyncio.to_thread(self._disk.abort)
+        await self._discard_chunks()
+        if self.chunks:
+            await self._publish(state)
+
+    async def _discard_chunks(self):
+        keys = [f"video:{self.video_id}:chunk:{i}" for i in range(self.chunks)]
+        if self.to_redis and keys:
+            await self.cache.redis.unlink(*keys)
+            log.info(f"Discarded {len(keys)} uncommitted chunks for video {self.video_id}")
+
+    async def _flush(self):
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        key = f"video:{self.video_id}:chunk:{self.chunks}"
+        if self._disk:
+            await asyncio.to_thread(self._disk.write, chunk)
+            CACHE_BYTES_WRITTEN.inc("disk", amount=len(chunk))
+
+        if await self.admit() and self.size + len(chunk) > MAX_OBJECT_SIZE:
+            log.info(f"Video {self.video_id} is too large for Redis, caching on disk only")
+            await self._discard_chunks()
+            self.to_redis = False
+        if self.to_redis:
+            with REDIS_LATENCY.time("set"):
+                await self.cache._retry_on_oom(
+                    lambda: self.cache.redis.set(key, value=chunk), f"chunk {key}", 3
+                )
+            CACHE_BYTES_WRITTEN.inc("redis", amount=len(chunk))
+        self.chunks += 1
+        self.size += len(chunk)
+        await self._publish(WRITING)
+
+    async def _publish(self, state: str):
+        if self.progressive:
+            await publish(
+                self.cache.redis,
+                self.video_id,
+                StreamState(str(self._disk.path), self.mime_type or "", self.size, state),
+            )
+
+
+class CacheReader(io.RawIOBase):
+    """Blocking, seekable file-like view of cached audio
+
+    Meant to be read from a worker thread, such as the thread :class:`discord.FFmpegAudio` uses
+    to feed a source into FFmpeg's stdin when ``pipe=True``. Tracks on the disk tier are read
+    straight from the mapped file on that thread. Otherwise, chunks are fetched from Redis on
+    the event loop one at a time, with the following chunk requested in the background while
+    the current one is consumed, so at most two chunks are held.
+
+    To play from part way through, the reader can cut out the bytes between the first
+    ``header_size`` bytes and ``start``, so it reads as the track's headers followed by its
+    audio from ``start_time`` on.
+    """
+
+    def __init__(
+        self,
+        cache: AudioCache,
+        video_id: str,
+        manifest: AudioManifest,
+        loop: asyncio.AbstractEventLoop,
+        header_size: int = 0,
+        start: int = 0,
+        start_time: float = 0.0,
+    ):
+        super().__init__()
+        self.cache = cache
+        self.video_id = video_id
+        self.manifest = manifest
+        self.loop = loop
+        self.start_time = start_time
+        self.header_size = header_size
+        self._skipped = max(start - header_size, 0)
+        self.size = manifest.size - self._skipped
+        self._position = 0
+        self._chunk_index = -1
+        self._chunk = b""
+        self._prefetch: tuple[int, Future] | None = None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self._position = max(offset, 0)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        # FFmpeg's pipe writer may still be reading when playback ends & the reader is closed
+        if self.closed or self._position >= self.size:
+            return 0
+
+        if self._position < self.header_size:
+            position, limit = self._position, self.header_size - self._position
+        else:
+            position, limit = self._position + self._skipped, len(buffer)
+        index, offset = divmod(position, self.manifest.chunk_size)
+        chunk = self._get_chunk(index)
+        size = min(len(buffer), limit, len(chunk) - offset)
+        buffer[:size] = chunk[offset : offset + size]
+        self._position += size
+        return size
+
+    def close(self):
+        if self._prefetch:
+            self._prefetch[1].cancel()
+            self._prefetch = None
+        self._chunk = b""
+        super().close()
+
+    def _get_chunk(self, index: int) -> bytes:
+        if index == self._chunk_index:
+            return self._chunk
+
+        start = index * self.manifest.chunk_size
+        chunk = self.cache.disk.read(self.video_id, start, start + self.manifest.chunk_size)
+        if chunk is not None:
+            CACHE_BYTES_READ.inc("disk", amount=len(chunk))
+            self._chunk, self._chunk_index = chunk, index
+            return chunk
+
+        if self._prefetch and self._prefetch[0] == index:
+            future = self._prefetch[1]
+        else:
+            if self._prefetch:
+                self._prefetch[1].cancel()
+            future = self._fetch(index)
+
+        # Start fetching the following chunk while this one is consumed
+        self._prefetch = None
+        if index + 1 < self.manifest.chunks:
+            self._prefetch = (index + 1, self._fetch(index + 1))
+
+        self._chunk = future.result(timeout=READ_TIMEOUT)
+        self._chunk_index = index
+        return self._chunk
+
+    def _fetch(self, index: int) -> Future:
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            raise RuntimeError("CacheReader must not be read from the event loop thread")
+        return asyncio.run_coroutine_threadsafe(
+            self.cache.read_chunk(self.video_id, index), self.loop
+        )
@@ -0,0 +1,209 @@
+"""Inspection & bulk maintenance of the audio cache"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from itertools import batched
+
+from src.admission import INDEX_KEY
+from src.cache import ADDED_KEY, BATCH_SIZE, AudioCache, AudioManifest
+from src.loudness import Loudness
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedTrack:
+    video_id: str
+    title: str | None
+    added_at: float | None
+    redis_size: int | None
+    disk_size: int | None
+
+    @property
+    def size(self) -> int:
+        return max(self.redis_size or 0, self.disk_size or 0)
+
+    @property
+    def tiers(self) -> list[str]:
+        return [
+            tier
+            for tier, size in (("disk", self.disk_size), ("redis", self.redis_size))
+            if size is not None
+        ]
+
+
+@dataclass
+class TrackDetails(CachedTrack):
+    manifest: AudioManifest | None
+    loudness: Loudness | None
+    frequency: int
+    idle_seconds: int | None
+
+
+@dataclass
+class CacheSize:
+    tracks: int
+    redis_tracks: int
+    redis_bytes: int
+    disk_tracks: int
+    disk_bytes: int
+
+
+class CacheManager:
+    """Lists, inspects & evicts cached tracks, going by the cache's index of videos
+
+    Bulk operations work through :data:`BATCH_SIZE` tracks per pipelined round trip and
+    remove keys with ``UNLINK``, yielding to the event loop between batches, so that neither
+    Redis nor the bot stalls while a large part of the cache is cleared.
+    """
+
+    def __init__(self, cache: AudioCache):
+        self.cache = cache
+        self.redis = cache.redis
+
+    async def list_tracks(self, offset: int = 0, limit: int = 10) -> list[CachedTrack]:
+        """List cached tracks, most recently cached first"""
+        entries = await self.redis.zrevrange(
+            ADDED_KEY, offset, offset + limit - 1, withscores=True
+        )
+        return await self._describe(
+            [(video_id.decode(), added_at) for video_id, added_at in entries]
+        )
+
+    async def count(self) -> int:
+        return await self.redis.zcard(ADDED_KEY)
+
+    async def size(self) -> CacheSize:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zcard(ADDED_KEY)
+            pipe.zrange(INDEX_KEY, 0, -1, withscores=True)
+            tracks, redis_entries = await pipe.execute()
+        return CacheSize(
+            tracks=tracks,
+            redis_tracks=len(redis_entries),
+            redis_bytes=int(sum(size for _, size in redis_entries)),
+            disk_tracks=len(self.cache.disk),
+            disk_bytes=self.cache.disk.size,
+        )
+
+    async def inspect(self, video_id: str) -> TrackDetails | None:
+        """Describe everything the cache holds for a video"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zscore(ADDED_KEY, video_id)
+            pipe.hgetall(f"video:{video_id}:manifest")
+            pipe.execute_command("OBJECT", "IDLETIME", f"video:{video_id}:manifest")
+            added_at, manifest, idle_seconds = await pipe.execute(raise_on_error=False)
+
+        (track,) = await self._describe([(video_id, added_at)])
+        manifest = AudioManifest.from_redis(manifest)
+        if not (manifest or track.tiers):
+            return None
+        (frequency,) = await self.cache.admission.sketch.estimate(video_id)
+        return TrackDetails(
+            **vars(track),
+            manifest=manifest,
+            loudness=await self.cache.get_loudness(video_id),
+            frequency=frequency,
+            idle_seconds=idle_seconds if isinstance(idle_seconds, int) else None,
+        )
+
+    async def evict(self, *video_ids: str) -> int:
+        """Evict tracks from both tiers"""
+        for batch in batched(video_ids, BATCH_SIZE):
+            await self.cache.evict(*batch)
+            await asyncio.sleep(0)
+        return len(video_ids)
+
+    async def evict_older_than(self, seconds: float) -> int:
+        """Evict every track cached more than ``seconds`` ago"""
+        cutoff = time.time() - seconds
+        evicted = 0
+        while video_ids := await self.redis.zrangebyscore(
+            ADDED_KEY, "-inf", cutoff, start=0, num=BATCH_SIZE
+        ):
+            evicted += await self.evict(*(video_id.decode() for video_id in video_ids))
+        log.info(f"Evicted {evicted} tracks cached before {time.ctime(cutoff)}")
+        return evicted
+
+    async def clear(self) -> int:
+        """Remove all cached audio & titles (metadata and request history are kept)
+
+        Keys are found with ``SCAN`` rather than the index, so tracks cached before the index
+        existed, and chunks left behind by interrupted writes, are removed too. Tracks still
+        being downloaded (by any process) are left alone, as their writers are still using them.
+        """
+        removed = 0
+        async for keys in self._scan_batches("video:*"):
+            keys = [key for key in keys if not key.endswith(b":meta")]
+            writing = await self._writing({key.decode().split(":")[1] for key in keys})
+            keys = [key for key in keys if key.decode().split(":")[1] not in writing]
+            if keys:
+                removed += await self.redis.unlink(*keys)
+            await asyncio.sleep(0)
+        await self.redis.unlink(ADDED_KEY, INDEX_KEY)
+
+        for video_id in self.cache.disk.video_ids():
+            await asyncio.to_thread(self.cache.disk.remove, video_id)
+        log.info(f"Cleared audio cache ({removed} Redis keys)")
+        return removed
+
+    async def reindex(self) -> int:
+        """Add any cached tracks missing from the index (e.g. cached before it existed)"""
+        found = {}
+        async for keys in self._scan_batches("video:*:manifest"):
+            now = time.time()
+            found.update({key.decode().split(":")[1]: now for key in keys})
+        found.update({video_id: time.time() for video_id in self.cache.disk.video_ids()})
+        if not found:
+            return 0
+
+        added = 0
+        for batch in batched(found.items(), BATCH_SIZE):
+            added += await self.redis.zadd(ADDED_KEY, dict(batch), nx=True)
+        log.info(f"Reindexed cache: {added} tracks added to the index")
+        return added
+
+    async def _writing(self, video_ids: set[str]) -> set[str]:
+        """The videos being downloaded right now, going by their download locks"""
+        video_ids = list(video_ids)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for video_id in video_ids:
+                pipe.exists(f"lock:download:{video_id}")
+            locked = await pipe.execute()
+        return {video_id for video_id, held in zip(video_ids, locked, strict=True) if held}
+
+    async def _scan_batches(self, match: str):
+        cursor = 0
+        while True:
+            cursor, keys = await self.redis.scan(cursor, match=match, count=BATCH_SIZE * 10)
+            if keys:
+                yield keys
+            if cursor == 0:
+                break
+
+    async def _describe(self, entries: list[tuple[str, float | None]]) -> list[CachedTrack]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for video_id, _ in entries:
+                pipe.get(f"video:{video_id}:title")
+                pipe.zscore(INDEX_KEY, video_id)
+                # Redis may have evicted the track by itself since it was indexed
+                pipe.exists(f"video:{video_id}:manifest")
+            results = await pipe.execute()
+
+        tracks = []
+        for (video_id, added_at), title, redis_size, in_redis in zip(
+            entries, results[::3], results[1::3], results[2::3], strict=True
+        ):
+            disk_entry = self.cache.disk.get(video_id)
+            tracks.append(
+                CachedTrack(
+                    video_id=video_id,
+                    title=title.decode() if title else None,
+                    added_at=added_at,
+                    redis_size=int(redis_size) if redis_size is not None and in_redis else None,
+                    disk_size=disk_entry.size if disk_entry else None,
+                )
+            )
+        return tracks
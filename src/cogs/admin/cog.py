@@ -3,12 +3,17 @@
 import asyncio
 import logging
 import os
+import re
 import signal
+import time
 
 from discord import Client, Interaction, app_commands
 from discord.ext.commands import Cog
 
+from src import metrics
+from src.cache_manager import CacheManager
 from src.models import PersistentMessage
+from src.utils import human_time_duration
 
 log = logging.getLogger(__name__)
 
@@ -146,6 +151,188 @@ class AdminCog(Cog):
             f"Autoreload is currently **{status}**", ephemeral=True
         )
 
+    @app_commands.command()
+    @is_owner()
+    async def cache_stats(self, interaction: Interaction):
+        """ADMIN ONLY: Show audio cache hit ratios, traffic & latency"""
+        lookups = {tier: metrics.CACHE_LOOKUPS.total(tier) for tier in ("disk", "redis", "miss")}
+        total = sum(lookups.values()) or 1
+        lines = ["**Lookups**"]
+        lines += [f"{tier}: {count:g} ({count / total:.0%})" for tier, count in lookups.items()]
+
+        lines.append("**Traffic**")
+        for tier in ("disk", "redis"):
+            read = metrics.CACHE_BYTES_READ.total(tier) / 1024 / 1024
+            written = metrics.CACHE_BYTES_WRITTEN.total(tier) / 1024 / 1024
+            lines.append(f"{tier}: {read:.1f} MB read, {written:.1f} MB written")
+
+        lines.append("**Redis latency** (p50 / p99, by bucket)")
+        for command in ("get", "mget", "set"):
+            if count := metrics.REDIS_LATENCY.count(command):
+                p50 = metrics.REDIS_LATENCY.quantile(0.5, command) * 1000
+                p99 = metrics.REDIS_LATENCY.quantile(0.99, command) * 1000
+                lines.append(f"{command}: ≤{p50:g} ms / ≤{p99:g} ms ({count} calls)")
+
+        evictions = ", ".join(
+            f"{tier} {reason}: {count:g}"
+            for (tier, reason), count in sorted(metrics.CACHE_EVICTIONS.values.items())
+        )
+        lines.append(f"**Evictions** {evictions or 'none'}")
+        lines.append(
+            f"**Admission** {metrics.CACHE_ADMISSIONS.total('admitted'):g} admitted, "
+            f"{metrics.CACHE_ADMISSIONS.total('rejected'):g} rejected, "
+            f"{metrics.CACHE_OOM_RETRIES.total():g} OOM retries"
+        )
+
+        if manager := self._cache_manager():
+            size = await manager.size()
+            memory = await manager.redis.info("memory")
+            stats = await manager.redis.info("stats")
+            lines.append(
+                f"**Size** {size.tracks} tracks · "
+                f"disk: {size.disk_tracks} tracks, {size.disk_bytes / 1024 / 1024:.0f}/"
+                f"{manager.cache.disk.max_size / 1024 / 1024:.0f} MB · "
+                f"redis: {size.redis_tracks} tracks, {size.redis_bytes / 1024 / 1024:.0f} MB "
+                f"({memory['used_memory_human']}/{memory['maxmemory_human']} used), "
+                f"{stats['evicted_keys']} keys evicted by Redis"
+            )
+
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+    @app_commands.command()
+    @is_owner()
+    async def cache_list(self, interaction: Interaction, page: int = 1):
+        """ADMIN ONLY: List cached tracks, most recently cached first
+
+        :param interaction: :class:`Interaction`
+        :param page: Page of the listing, 10 tracks per page
+        """
+        if not (manager := self._cache_manager()):
+            return await interaction.response.send_message("Music system not available")
+
+        page = max(page, 1)
+        tracks = await manager.list_tracks(offset=(page - 1) * 10, limit=10)
+        pages = max(-(-await manager.count() // 10), 1)
+        lines = [f"**Cached tracks** (page {min(page, pages)}/{pages})"]
+        for track in tracks:
+            lines.append(
+                f"`{track.video_id}` {track.title or '?'} · {track.size / 1024 / 1024:.1f} MB"
+                f" · {', '.join(track.tiers) or 'evicted'}"
+            )
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+    @app_commands.command()
+    @is_owner()
+    async def cache_inspect(self, interaction: Interaction, video: str):
+        """ADMIN ONLY: Show everything cached for a video
+
+        :param interaction: :class:`Interaction`
+        :param video: YouTube video ID or URL
+        """
+        if not (manager := self._cache_manager()):
+            return await interaction.response.send_message("Music system not available")
+
+        video_id = next(iter(self._video_ids(video)), video)
+        if not (track := await manager.inspect(video_id)):
+            return await interaction.response.send_message(
+                f"`{video_id}` is not cached", ephemeral=True
+            )
+
+        lines = [f"**{track.title or '?'}** (`{track.video_id}`)"]
+        lines.append(f"Tiers: {', '.join(track.tiers) or 'none'}")
+        if track.disk_size is not None:
+            lines.append(f"Disk: {track.disk_size / 1024 / 1024:.1f} MB")
+        if track.manifest:
+            lines.append(
+                f"Redis: {track.manifest.size / 1024 / 1024:.1f} MB in {track.manifest.chunks} "
+                f"chunks ({track.manifest.mime_type})"
+            )
+            if track.idle_seconds:
+                lines.append(f"Last used in Redis: {human_time_duration(track.idle_seconds)} ago")
+        if track.loudness:
+            lines.append(
+                f"Loudness: {track.loudness.integrated:.1f} LUFS, "
+                f"peak {track.loudness.true_peak:.1f} dBTP"
+            )
+        if track.added_at:
+            age = human_time_duration(time.time() - track.added_at)
+            lines.append(f"Cached: {age} ago")
+        lines.append(f"Requests (estimated): {track.frequency}")
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+    @app_commands.command()
+    @is_owner()
+    async def cache_evict(self, interaction: Interaction, videos: str):
+        """ADMIN ONLY: Evict tracks from the cache
+
+        :param interaction: :class:`Interaction`
+        :param videos: YouTube video IDs or URLs, separated by spaces or commas
+        """
+        if not (manager := self._cache_manager()):
+            return await interaction.response.send_message("Music system not available")
+
+        video_ids = self._video_ids(videos)
+        await interaction.response.defer(ephemeral=True)
+        evicted = await manager.evict(*video_ids)
+        await interaction.followup.send(f"🗑️ Evicted {evicted} tracks", ephemeral=True)
+
+    @app_commands.command()
+    @is_owner()
+    async def cache_evict_older(self, interaction: Interaction, days: float):
+        """ADMIN ONLY: Evict tracks cached more than a number of days ago
+
+        :param interaction: :class:`Interaction`
+        :param days: Age in days
+        """
+        if not (manager := self._cache_manager()):
+            return await interaction.response.send_message("Music system not available")
+
+        await interaction.response.defer(ephemeral=True)
+        evicted = await manager.evict_older_than(days * 24 * 60 * 60)
+        await interaction.followup.send(
+            f"🗑️ Evicted {evicted} tracks cached over {days:g} days ago", ephemeral=True
+        )
+
+    @app_commands.command()
+    @is_owner()
+    async def cache_clear(self, interaction: Interaction):
+        """ADMIN ONLY: Remove all cached audio from both tiers"""
+        if not (manager := self._cache_manager()):
+            return await interaction.response.send_message("Music system not available")
+
+        await interaction.response.defer(ephemeral=True)
+        removed = await manager.clear()
+        await interaction.followup.send(
+            f"🧹 Cleared the audio cache ({removed} Redis keys)", ephemeral=True
+        )
+
+    @app_commands.command()
+    @is_owner()
+    async def cache_reindex(self, interaction: Interaction):
+        """ADMIN ONLY: Index cached tracks missing from the cache index"""
+        if not (manager := self._cache_manager()):
+            return await interaction.response.send_message("Music system not available")
+
+        await interaction.response.defer(ephemeral=True)
+        added = await manager.reindex()
+        await interaction.followup.send(f"📇 Added {added} tracks to the index", ephemeral=True)
+
+    def _cache_manager(self) -> CacheManager | None:
+        if music_cog := self.bot.reloader.cogs.get("music"):
+            return CacheManager(music_cog.cache)
+        return None
+
+    @staticmethod
+    def _video_ids(videos: str) -> list[str]:
+        """Pick video IDs out of a list of IDs and/or URLs"""
+        video_ids = []
+        for video in re.split(r"[\s,]+", videos.strip()):
+            if match := re.search(r"(?:v=|youtu\.be/|embed/)([\w-]{11})", video):
+                video_ids.append(match.group(1))
+            elif video:
+                video_ids.append(video)
+        return list(dict.fromkeys(video_ids))
+
     @app_commands.command(name="restart", description="ADMIN ONLY: Restart the bot process")
     @is_owner()
     async def restart(self, interaction: Interaction):
@@ -94,7 +94,7 @@ class DashboardCog(commands.Cog):
 
             # Now we can set the dashboard channel
             log.info("Sending initial dashboard message...")
-            embed = await self.view.update_dashboard()
+            embed = await self.view.update_dashboard(guild=interaction.guild)
             message = await interaction.channel.send(embed=embed, view=self.view)
 
             log.info("Generating new PersistentMessage record...")
@@ -233,7 +233,7 @@ class DashboardCog(commands.Cog):
             # Create new message
             old_message_id = persistent_message.message_id
             log.info("Creating and sending new persistent message...")
-            embed = await self.view.update_dashboard()
+            embed = await self.view.update_dashboard(guild=message.guild)
             new_message = await message.channel.send(embed=embed, view=self.view)
 
             # Update database
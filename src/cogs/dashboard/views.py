@@ -1,9 +1,8 @@
 import logging
 from typing import TYPE_CHECKING
 
-from discord import ButtonStyle, Color, Embed, Interaction, Message, ui
+from discord import ButtonStyle, Color, Embed, Guild, Interaction, Message, ui
 from discord.ui import Button, View
-from pytubefix import YouTube
 
 from src.cogs.music.views import SongSearchModal
 from src.utils import QueueItem
@@ -30,17 +29,17 @@ class DashboardView(View):
                 "Music system not available", ephemeral=False
             )
 
-        if not music_cog.currently_playing:
+        player = music_cog.players.get(interaction.guild.id)
+        if not player or not player.current:
             return await interaction.response.send_message("Nothing is playing", ephemeral=False)
 
         # Toggle playback
-        voice_client = interaction.guild.voice_client
-        if voice_client.is_paused():
-            voice_client.resume()
+        if player.resume():
             await interaction.response.send_message("▶️ Resumed", ephemeral=False)
-        else:
-            voice_client.pause()
+        elif player.pause():
             await interaction.response.send_message("⏸️ Paused", ephemeral=False)
+        else:
+            await interaction.response.send_message("Nothing is playing", ephemeral=False)
 
     @ui.button(label="𝗦𝗞𝗜𝗣", style=ButtonStyle.danger, custom_id="dashboard:skip")
     async def skip(self, interaction: Interaction, button: Button):
@@ -80,9 +79,15 @@ class DashboardView(View):
         await self.update_dashboard(interaction)
 
     async def update_dashboard(
-        self, interaction: Interaction | None = None, message: Message | None = None
+        self,
+        interaction: Interaction | None = None,
+        message: Message | None = None,
+        guild: Guild | None = None,
     ):
-        """Update dashboard content"""
+        """Update dashboard content for a guild (taken from the interaction or message if given)"""
+        if guild is None:
+            guild = interaction.guild if interaction else message.guild if message else None
+
         embed = Embed(title="𝗗𝗮𝘀𝗵𝗯𝗼𝗮𝗿𝗱 - - - - - - - - - - - - - - - - -", color=Color.green())
         embed.url = "https://github.com/quartzar/quartzbot"
 
@@ -109,18 +114,19 @@ class DashboardView(View):
         # log.info(self.bot.reloader.cogs["music"])
         # Add music info if available
         music_cog = self.bot.reloader.cogs["music"]
-        if music_cog and music_cog.currently_playing:
-            current: QueueItem = music_cog.currently_playing
+        player = music_cog.players.get(guild.id) if music_cog and guild else None
+        if player and player.current:
+            current: QueueItem = player.current
             embed.add_field(
                 name="Now Playing",
                 value=f"🎵 {current.title}",
                 inline=False,
             )
-            yt = YouTube(url=current.url)
-            embed.set_image(url=yt.thumbnail_url)
-            if music_cog.queue:
+            if meta := await music_cog.cache.metadata.get(current.video_id, current.url):
+                embed.set_image(url=meta.thumbnail_url)
+            if player.queue:
                 next_up = "\n".join(
-                    f"{i + 1}. {item.title}" for i, item in enumerate(list(music_cog.queue)[:3])
+                    f"{i + 1}. {item.title}" for i, item in enumerate(player.queue[:3])
                 )
                 embed.add_field(name="Queue", value=next_up or "Empty", inline=False)
         else:
@@ -1,42 +1,51 @@
 import asyncio
+import io
 import logging
-import os
 import re
-from collections import deque
+from datetime import timedelta
 
 from discord import (
     Client,
     Color,
     Embed,
-    FFmpegOpusAudio,
     File,
+    Guild,
     Interaction,
-    VoiceClient,
-    VoiceProtocol,
     app_commands,
 )
 from discord.ext import commands
-from pytubefix import Search, YouTube
 
-from src.activities import Activities
 from src.cache import AudioCache
-from src.cogs.music.views import SongSelector
-from src.utils import QueueItem, human_time_duration
-
-FFMPEG_OPTIONS = {
-    "options": "-vn",  # Disable video
-}
+from src.cogs.music.persistence import QueueStore
+from src.cogs.music.player import PROGRESSIVE_PLAYBACK, GuildPlayer
+from src.cogs.music.views import QueueView, SongSelector
+from src.disk_cache import INGEST_WORKERS
+from src.downloader import Downloader, DownloadJob, DownloadProgress
+from src.history import PlayHistory
+from src.ingest import IngestClient
+from src.playlist import ImportProgress
+from src.utils import QueueItem, format_timestamp, human_time_duration, parse_timestamp
+from src.warmup import CacheWarmer
 
 log = logging.getLogger(__name__)
 
+# Playlist pages, e.g. https://www.youtube.com/playlist?list=PL...
+# (watch URLs that are part of a playlist just play the video)
+PLAYLIST_PATTERN = re.compile(r"youtube\.com\/playlist\?(?:.*&)?list=[\w-]+")
+
 
 class MusicCog(commands.Cog):
     def __init__(self, bot: Client, **kwargs):
         self.bot = bot
         self.cache = AudioCache()
-        self.download_progress = {}
-        self.currently_playing = kwargs.get("currently_playing", None)
-        self.queue = kwargs.get("queue", deque())
+        # Either downloads in worker threads here, or hands them to ingest worker processes
+        self.downloader = IngestClient(self.cache) if INGEST_WORKERS else Downloader(self.cache)
+        self.store = QueueStore(self.cache)
+        self.history = PlayHistory()
+        self.warmer = CacheWarmer(self.cache, self.downloader, self.history)
+        self.players: dict[int, GuildPlayer] = kwargs.get("players", {})
+        self._restored = False
+        self._watches: set[asyncio.Task] = set()
 
     """"""
 
@@ -58,18 +67,22 @@ class MusicCog(commands.Cog):
             )
             return
 
+        if PLAYLIST_PATTERN.search(url):
+            await self.play_playlist(interaction, url)
+            return
+
         video_id = re.search(
             r'(?:youtube\.com\/(?:[^\/]+\/.+\/|(?:v|e(?:mbed)?)\/|.*[?&]v=)|youtu\.be\/)([^"&?\/\s]{11})',
             url,
         )
         if not video_id:
-            # Didn't get a URL, search instead and get first 5 results
-            search = Search(url)
-
-            results = search.videos[:7]
+            # Didn't get a URL, search instead. Searching can outlast the interaction deadline,
+            # so acknowledge it first
+            await interaction.response.defer(ephemeral=False)
+            results = await self.cache.metadata.search(url, limit=7)
 
             if not results:
-                await interaction.response.send_message("No results found!")
+                await interaction.followup.send("No results found!")
                 return
 
             # Create embed with search results
@@ -89,10 +102,8 @@ class MusicCog(commands.Cog):
             # Create view with selection menu
             view = SongSelector(results, self, interaction)
 
-            await interaction.response.send_message(embed=embed, view=view, ephemeral=False)
-
             # Store message reference for timeout handling
-            view.message = await interaction.original_response()
+            view.message = await interaction.followup.send(embed=embed, view=view, wait=True)
             return
 
         # If we got here, it's a direct URL
@@ -111,62 +122,39 @@ class MusicCog(commands.Cog):
         await interaction.response.defer(ephemeral=False)
 
         # Check cache first
-        audio_data = self.cache.get_audio(video_id)
-        title = self.cache.get_title(video_id)
+        manifest, title = await self.cache.get(video_id)
+        job = None
         try:
-            if not audio_data:
-                # Download if not cached
-                yt = YouTube(url, on_progress_callback=self.on_progress)
-                title = yt.title
-
-                # Download directly to temp directory for initial download
-                stream = yt.streams.filter(only_audio=True).order_by("abr").desc().first()
-                log.info(f"Highest quality audio stream found: {stream}")
-                temp_download_path = os.path.join(self.cache.temp_dir, f"download_{video_id}")
-
-                # Initialise progress tracking
-                self.download_progress[video_id] = {
-                    "stream": stream,
-                    "completed": False,
-                    "percent": 0,
-                }
-
-                # Start download
-                stream.download(output_path=self.cache.temp_dir, filename=f"download_{video_id}")
-
-                # Wait for download to complete
-                if not await self.wait_for_download(video_id):
-                    raise TimeoutError("Download timed out")
-
-                # Verify file exists
-                if not os.path.exists(temp_download_path):
-                    raise FileNotFoundError(f"Downloaded file not found: {temp_download_path}")
-
-                log.info(f"Download completed: {temp_download_path}")
-
-                # Read the file into Redis and delete the temp download file
-                with open(temp_download_path, "rb") as f:
-                    audio_data = f.read()
-                os.unlink(temp_download_path)
-                log.info("Temporary download file deleted")
-
-                self.cache.cache_audio(video_id, audio_data)
-                self.cache.cache_title(video_id, title)
+            if not manifest:
+                job = self.downloader.download(video_id, url, progressive=PROGRESSIVE_PLAYBACK)
+                if PROGRESSIVE_PLAYBACK:
+                    # Queue it straight away, the player streams it as it downloads
+                    if not give_me_file:  # Otherwise awaited below, to send the file
+                        self._watch_download(interaction, job)
+                    title = (await self.cache.metadata.get(video_id, url)).title
+                else:
+                    # Download first, reporting progress on the deferred response
+                    job.add_progress_listener(
+                        lambda progress: self.on_download_progress(interaction, progress)
+                    )
+                    title = await job
 
             # Create queue item
             queue_item = QueueItem(
-                video_id=video_id, title=title, requested_by=interaction.user.name, url=url
+                video_id=video_id, title=title, requested_by=interaction.user.name
             )
 
-            # Add to queue
-            self.queue.append(queue_item)
-            position = len(self.queue)
+            # Add to this guild's queue, which starts playback if nothing is playing
+            player = self.get_player(interaction.guild)
+            starting = player.is_idle
+            position = player.enqueue(
+                queue_item, interaction.user.voice.channel, interaction.channel
+            )
 
-            # If nothing is playing, start playback
-            voice_channel = interaction.user.voice.channel
-            voice_client: VoiceClient | VoiceProtocol = interaction.guild.voice_client
-            if not self.currently_playing or not voice_client.is_playing():
-                await self.play_next(interaction)
+            if starting:
+                await interaction.edit_original_response(
+                    content=f"> ▶️ *Playing* __{title}__", embed=None, view=None
+                )
             else:
                 await interaction.edit_original_response(
                     content=f"> __{title}__ *added to queue at position* **{position}**",
@@ -181,11 +169,13 @@ class MusicCog(commands.Cog):
 
             # Send the file if user requested it
             if give_me_file:
-                temp_file_path = os.path.join(self.cache.temp_dir, f"play_{video_id}.m4a")
-                with open(temp_file_path, "wb") as f:
-                    f.write(audio_data)
-                await interaction.followup.send(file=File(temp_file_path, filename=f"{title}.m4a"))
-                os.unlink(temp_file_path)
+                if job:
+                    await job
+                manifest = await self.cache.get_manifest(video_id)
+                audio_file = io.BytesIO(await self.cache.read_range(video_id, manifest=manifest))
+                await interaction.followup.send(
+                    file=File(audio_file, filename=f"{title}.{manifest.extension}")
+                )
 
         except Exception as e:
             await interaction.followup.send(
@@ -195,13 +185,44 @@ class MusicCog(commands.Cog):
 
     """"""
 
+    async def play_playlist(self, interaction: Interaction, url: str):
+        """Queue every track in a playlist, streaming entries in so the first plays right away"""
+        log.info("Running [underline]play_playlist()[/]")
+        await interaction.response.defer(ephemeral=False)
+
+        player = self.get_player(interaction.guild)
+        playlist = player.import_playlist(
+            url,
+            requested_by=interaction.user.name,
+            voice_channel=interaction.user.voice.channel,
+            text_channel=interaction.channel,
+            on_progress=lambda progress: self.on_import_progress(interaction, progress),
+        )
+        try:
+            await playlist
+        except asyncio.CancelledError:
+            if not playlist.task.cancelled():
+                raise
+            # Stopped before the import finished
+            await interaction.edit_original_response(
+                content=f"> ⏹️ *Stopped importing* __{playlist.progress.title}__"
+            )
+        except Exception as e:
+            await interaction.followup.send(
+                f"An error occurred: ```\n{str(e)}\n```",
+            )
+            log.exception(f"An error occurred importing playlist {url}: {e}")
+
+    """"""
+
     @app_commands.command()
     async def skip(self, interaction: Interaction):
         """Skip current song"""
         await self._skip(interaction)
 
     async def _skip(self, interaction: Interaction):
-        if not interaction.guild.voice_client:
+        player = self.players.get(interaction.guild.id)
+        if not player or not player.skip():
             await interaction.response.send_message(
                 "Nothing is playing!",
             )
@@ -210,52 +231,103 @@ class MusicCog(commands.Cog):
         await interaction.response.send_message(
             "Skipping current song",
         )
-        await self.terminate_playback(interaction.guild.voice_client)
-        await self.play_next(interaction)
 
     """"""
 
     @app_commands.command()
     async def queue(self, interaction: Interaction):
         """Show current queue"""
-        if not self.currently_playing and not self.queue:
+        player = self.players.get(interaction.guild.id)
+        if not player or player.is_idle:
             await interaction.response.send_message(
                 "Nothing is playing or queued",
             )
             return
 
-        queue_text = []
-        if self.currently_playing:
-            queue_text.append(
-                f"🎵  Now Playing: __{self.currently_playing.title}__ `(requested by {self.currently_playing.requested_by})`"
-            )
+        # Only one page is rendered at a time, however long the queue is
+        view = QueueView(player)
+        await interaction.response.send_message(view.render(), view=view)
+        view.message = await interaction.original_response()
 
-        if self.queue:
-            queue_text.append("\n📋 __queue__")
-            for i, item in enumerate(self.queue, 1):
-                queue_text.append(f"{i}. {item.title} (requested by {item.requested_by})")
+    """"""
 
-        await interaction.response.send_message(
-            "\n".join(queue_text),
-        )
+    @app_commands.command()
+    async def remove(self, interaction: Interaction, position: int):
+        """Remove a song from the queue
+
+        :param interaction: :class:`Interaction`
+        :param position: Position of the song in the queue
+        """
+        player = self.players.get(interaction.guild.id)
+        if not player or not 1 <= position <= len(player.queue):
+            await interaction.response.send_message("There's no song at that position!")
+            return
+
+        item = player.remove(position - 1)
+        await interaction.response.send_message(f"🗑️ Removed __{item.title}__ from the queue")
+
+    """"""
+
+    @app_commands.command()
+    async def move(self, interaction: Interaction, position: int, to: int):
+        """Move a song to another position in the queue
+
+        :param interaction: :class:`Interaction`
+        :param position: Current position of the song in the queue
+        :param to: Position to move the song to
+        """
+        player = self.players.get(interaction.guild.id)
+        if not player or not 1 <= position <= len(player.queue):
+            await interaction.response.send_message("There's no song at that position!")
+            return
+
+        to = min(max(to, 1), len(player.queue))
+        item = player.move(position - 1, to - 1)
+        await interaction.response.send_message(f"↕️ Moved __{item.title}__ to position **{to}**")
+
+    """"""
+
+    @app_commands.command()
+    async def shuffle(self, interaction: Interaction):
+        """Shuffle the queue"""
+        player = self.players.get(interaction.guild.id)
+        if not player or not player.queue:
+            await interaction.response.send_message("The queue is empty!")
+            return
+
+        player.shuffle()
+        await interaction.response.send_message(f"🔀 Shuffled {len(player.queue)} songs")
+
+    """"""
+
+    @app_commands.command()
+    async def dedupe(self, interaction: Interaction):
+        """Remove repeated songs from the queue"""
+        player = self.players.get(interaction.guild.id)
+        if not player or not player.queue:
+            await interaction.response.send_message("The queue is empty!")
+            return
+
+        if removed := player.dedupe():
+            await interaction.response.send_message(f"🧹 Removed {removed} repeated songs")
+        else:
+            await interaction.response.send_message("No repeated songs in the queue")
 
     """"""
 
     @app_commands.command()
     async def pause(self, interaction: Interaction):
         """Pause the current song"""
-        if not interaction.guild.voice_client:
+        player = self.players.get(interaction.guild.id)
+        if not player or not player.voice_client:
             await interaction.response.send_message(
                 "Nothing is playing!",
             )
             return
 
-        voice_client = interaction.guild.voice_client
-
-        if voice_client.is_playing():
-            voice_client.pause()
+        if player.pause():
             await interaction.response.send_message(
-                f"⏸️ Paused: {self.currently_playing.title}",
+                f"⏸️ Paused: {player.current.title}",
             )
         else:
             await interaction.response.send_message(
@@ -267,18 +339,16 @@ class MusicCog(commands.Cog):
     @app_commands.command()
     async def resume(self, interaction: Interaction):
         """Resume the current song"""
-        if not interaction.guild.voice_client:
+        player = self.players.get(interaction.guild.id)
+        if not player or not player.voice_client:
             await interaction.response.send_message(
                 "Nothing is paused!",
             )
             return
 
-        voice_client = interaction.guild.voice_client
-
-        if voice_client.is_paused():
-            voice_client.resume()
+        if player.resume():
             await interaction.response.send_message(
-                f"▶️ Resumed: {self.currently_playing.title}",
+                f"▶️ Resumed: {player.current.title}",
             )
         else:
             await interaction.response.send_message(
@@ -288,201 +358,163 @@ class MusicCog(commands.Cog):
     """"""
 
     @app_commands.command()
-    async def stop(self, interaction: Interaction):
-        """Stop playing audio"""
-        if not interaction.guild.voice_client:
-            await interaction.response.send_message("I'm not playing anything!", ephemeral=False)
-            return
+    async def seek(self, interaction: Interaction, position: str):
+        """Jump to a point in the current song
 
-        interaction.guild.voice_client.stop()
-        await interaction.response.send_message("Stopped playing audio", ephemeral=False)
-
-    """"""
-
-    """
-    UTILITY
-    """
+        :param interaction: :class:`Interaction`
+        :param position: Where to jump to, e.g. 90 or 1:30
+        """
+        player = self.players.get(interaction.guild.id)
+        if not player or not player.current:
+            await interaction.response.send_message("Nothing is playing!")
+            return
+        try:
+            seconds = parse_timestamp(position)
+        except ValueError:
+            await interaction.response.send_message(
+                f"Couldn't read `{position}` as a position, try something like `1:30`"
+            )
+            return
 
-    async def terminate_playback(self, voice_client):
-        """Safely terminate current playback"""
-        if voice_client and voice_client.is_playing():
-            voice_client.stop()
-            # Wait a brief moment for FFmpeg to clean up
-            await asyncio.sleep(0.5)
-            return True
-        return False
+        await interaction.response.defer()
+        landed = await player.seek(seconds)
+        if landed is None:
+            await interaction.followup.send("Nothing is playing!")
+        else:
+            await interaction.followup.send(
+                f"⏩ Jumped to `{format_timestamp(landed)}` in __{player.current.title}__"
+            )
 
     """"""
 
-    async def play_next(self, interaction: Interaction):
-        """Play next item in queue"""
-        if not self.queue:
-            self.currently_playing = None
+    @app_commands.command()
+    async def stop(self, interaction: Interaction):
+        """Stop playing audio and clear the queue"""
+        player = self.players.get(interaction.guild.id)
+        if not player or not player.voice_client:
+            await interaction.response.send_message("I'm not playing anything!", ephemeral=False)
             return
 
-        next_item = self.queue.popleft()
-        await self.play_audio(interaction, next_item)
+        player.stop()
+        await interaction.response.send_message("Stopped playing audio", ephemeral=False)
 
     """"""
 
-    async def play_audio(self, interaction: Interaction, queue_item: QueueItem):
-        """Handle the actual audio playback"""
-        try:
-            # Extract from cache to temp file only for playback
-            temp_playback_path = os.path.join(
-                self.cache.temp_dir, f"play_{queue_item.video_id}.m4a"
-            )
-
-            # Get audio data from cache
-            audio_data = self.cache.get_audio(queue_item.video_id)
-            if not audio_data:
-                raise ValueError("Audio data not found in cache")
-
-            log.info(f"Extracting audio to temporary playback file: {temp_playback_path}")
-            with open(temp_playback_path, "wb") as f:
-                f.write(audio_data)
-
-            # Connect to voice
-            voice_channel = interaction.user.voice.channel
-            voice_client: VoiceClient | VoiceProtocol = interaction.guild.voice_client
-
-            if voice_client is None:
-                voice_client = await voice_channel.connect()
-            elif voice_client.channel != voice_channel:
-                await voice_client.move_to(voice_channel)
-
-            # Update currently playing
-            self.currently_playing = queue_item
-
-            def after_playing(error):
-                try:
-                    if os.path.exists(temp_playback_path):
-                        os.unlink(temp_playback_path)
-                        log.info(f"Cleaned up temporary playback file: {temp_playback_path}")
-                except Exception as e:
-                    log.error(f"Cleanup error: {e}")
-                if error:
-                    log.error(f"Player error: {error}")
-
-                # Schedule playing the next song
-                asyncio.run_coroutine_threadsafe(self.play_next(interaction), self.bot.loop)
-
-            # Play the audio file
-            voice_client.play(
-                FFmpegOpusAudio(temp_playback_path, **FFMPEG_OPTIONS),
-                after=after_playing,
-            )
+    @app_commands.command()
+    async def top(self, interaction: Interaction, days: int = 30):
+        """Show this server's most played songs
 
-            yt = YouTube(url=queue_item.url)
+        :param interaction: :class:`Interaction`
+        :param days: How many days back to count plays from
+        """
+        most_played = await self.history.most_played(
+            10, since=timedelta(days=days), guild_id=interaction.guild.id
+        )
+        if not most_played:
+            await interaction.response.send_message(f"Nothing played in the last {days} days")
+            return
 
-            # Construct the embed
-            embed = Embed(
-                title=yt.title,
-                description=f"**Author:** {yt.author}\n"
-                f"**Length:** {human_time_duration(yt.length)}\n"
-                f"**Uploaded:** {str(yt.publish_date).split(' ')[0]}\n"
-                f"**Views:** {yt.views:,}\n",
-                color=Color.green(),
-                url=yt.embed_url,
-                timestamp=interaction.created_at,
-            )
+        metadata = await self.cache.metadata.get_many([video_id for video_id, _ in most_played])
+        lines = [f"🏆 __Most played in the last {days} days__"]
+        for i, ((video_id, plays), meta) in enumerate(zip(most_played, metadata, strict=True), 1):
+            lines.append(f"{i}. {meta.title if meta else video_id} `({plays} plays)`")
+        await interaction.response.send_message("\n".join(lines))
 
-            # youtube_logo_url = "https://png.pngtree.com/png-clipart/20221018/ourmid/pngtree-youtube-social-media-3d-stereo-png-image_6308427.png"
-            embed.set_thumbnail(url=yt.thumbnail_url)
+    """"""
 
-            # Get the requester info
-            requester = interaction.guild.get_member_named(queue_item.requested_by)
-            embed.set_footer(
-                text=f"Requested by {queue_item.requested_by}",
-                icon_url=requester.display_avatar.url,
-            )
-            # embed.set_author(name=requester.display_name, url=f"https://discord.com/users/{requester.id}", icon_url=requester.display_avatar.url)
-            embed.set_author(
-                name="Now Playing",
-                icon_url="https://cdn-icons-png.flaticon.com/512/10181/10181264.png",
-            )
+    """
+    UTILITY
+    """
 
-            # filename = f"{queue_item.video_id}_thumbnail.jpg"
-            # thumbnail = await download_image_from_url(url=yt.thumbnail_url)
-            # file = File(thumbnail, filename=filename)
-            # embed.set_image(url=f"attachment://{filename}")
-
-            # set embed video to the YouTube video:
-            # embed.video
-
-            # embed.set_image(url=f"attachment://{filename}")
-            # requester = interaction.guild.get_member_named(queue_item.requested_by)
-            # embed.set_footer(text=f"Requested by {queue_item.requested_by}", icon_url=requester.display_avatar.url)
-            # embed.set_thumbnail(url=f"attachment://{filename}")
-            # # get the person who requested the song from queue_item and generate a link to their Discord:
-            # embed.set_author(name=requester.display_name, url=f"https://discord.com/users/{requester.id}", icon_url=requester.display_avatar.url)
-
-            await interaction.followup.send(embed=embed)
-
-            await self.bot.change_presence(
-                **Activities.youtube(
-                    title=yt.title,
-                    url=yt.watch_url,
-                    author=yt.author,
-                    application_id=self.bot.application_id,
-                )
+    def get_player(self, guild: Guild) -> GuildPlayer:
+        """Get the guild's player, creating it on first use"""
+        if guild.id not in self.players:
+            self.players[guild.id] = GuildPlayer(
+                self.bot, guild, self.cache, self.downloader, self.store, self.history
             )
+        return self.players[guild.id]
 
-            # activity = Activity(type=Streaming, name=yt.title, url=yt.watch_url, details=yt.description, buttons=[{"label": "Watch", "url": yt.watch_url}])
-            # activity = Streaming(
-            #     name=yt.title, url=yt.watch_url, platform="YouTube", details=yt.description
-            # )
-            # await self.bot.change_presence(activity=activity)
-
-            # await interaction.followup.send(
-            #     f"[**`Now playing:`** **__`{yt.title}`__**]({yt.embed_url})\n"
-            #     f"`Author: {yt.author}` | `Length: {human_time_duration(yt.length)}`\n"
-            #     f"`Uploaded: {yt.publish_date}` | `Views: {yt.views}`"
-            # )
+    """"""
 
-        except Exception as e:
-            log.error(f"Error in play_audio: {e}")
-            if os.path.exists(temp_playback_path):
-                os.unlink(temp_playback_path)
-            raise e
+    async def restore_players(self):
+        """Restore the queues saved before the last shutdown, resuming where they left off"""
+        if self._restored:
+            return
+        self._restored = True
+
+        for saved in await self.store.load_all():
+            if not self.bot.owns_guild(saved.guild_id):
+                continue  # Restored by the process connecting its shard
+            guild = self.bot.get_guild(saved.guild_id)
+            voice_channel = guild and guild.get_channel(saved.voice_channel_id)
+            if not voice_channel:
+                # Left the guild, or the channel is gone
+                self.store.clear(saved.guild_id)
+                continue
+            if guild.id in self.players or not (saved.current or saved.queue):
+                continue
+            self.get_player(guild).restore(saved)
+
+    async def save_state(self):
+        """Save every player's state (and buffered plays) for the next startup
+
+        Player changes made from then on are ignored.
+        """
+        for player in self.players.values():
+            if player.current:
+                self.store.set_offset(player.guild.id, player.position)
+        await self.store.close()
+        await self.history.flush()
 
     """"""
 
-    async def wait_for_download(self, video_id: str, timeout: int = 30) -> bool:
-        """Wait for download to complete"""
-        start_time = asyncio.get_event_loop().time()
+    async def on_download_progress(self, interaction: Interaction, progress: DownloadProgress):
+        """Show download progress on the interaction's response"""
+        if progress.completed:
+            content = f"✅ Downloaded __{progress.title}__"
+        else:
+            content = f"⬇️ Downloading __{progress.title}__ `{progress.percent:.0f}%`"
+        await interaction.edit_original_response(content=content)
+
+    def _watch_download(self, interaction: Interaction, job: DownloadJob):
+        """Report a download that /play didn't wait for in the channel, should it fail"""
+
+        async def watch():
+            try:
+                await job
+            except Exception as e:
+                log.error(f"Download of video {job.video_id} failed after queueing it: {e}")
+                await interaction.channel.send(
+                    f"❌ Failed to download `{job.video_id}`: ```\n{e}\n```"
+                )
 
-        while True:
-            if video_id in self.download_progress:
-                if self.download_progress[video_id]["completed"]:
-                    del self.download_progress[video_id]
-                    await asyncio.sleep(0.2)
-                    return True
+        def on_done(task: asyncio.Task):
+            self._watches.discard(task)
+            if not task.cancelled() and (e := task.exception()):
+                log.error(f"Failed to report download failure of video {job.video_id}: {e}")
 
-            # Check timeout
-            if asyncio.get_event_loop().time() - start_time > timeout:
-                return False
+        task = asyncio.create_task(watch())
+        self._watches.add(task)
+        task.add_done_callback(on_done)
 
-            await asyncio.sleep(0.1)
+    async def on_import_progress(self, interaction: Interaction, progress: ImportProgress):
+        """Show playlist import progress on the interaction's response"""
+        failed = f", {progress.failed} unavailable" if progress.failed else ""
+        if progress.completed:
+            content = f"> 📃 *Queued* **{progress.queued}** *tracks from* __{progress.title}__"
+        else:
+            content = f"> 📃 *Queueing* __{progress.title}__ `{progress.queued} tracks`"
+        await interaction.edit_original_response(content=content + failed)
 
     """"""
 
-    def on_progress(self, stream, chunk: bytes, bytes_remaining: int):
-        """Callback for download progress"""
-        # Get video_id from our stored progress data
-        total_size = stream.filesize
-        bytes_downloaded = total_size - bytes_remaining
-
-        # Find the video_id from the progress dict that matches this stream
-        for video_id, data in self.download_progress.items():
-            if data.get("stream") == stream:
-                self.download_progress[video_id].update(
-                    {
-                        "completed": bytes_downloaded >= total_size,
-                        "percent": (bytes_downloaded / total_size) * 100,
-                    }
-                )
-                log.info(f"Download progress: {self.download_progress[video_id]['percent']:.1f}%")
-                break
-
-    """"""
+    async def cog_unload(self):
+        """Release the players & download workers when the cog is unloaded or reloaded"""
+        self.warmer.cancel()
+        for player in self.players.values():
+            player.close()
+        self.downloader.shutdown()
+        try:
+            await self.history.flush()
+        except Exception as e:
+            log.error(f"Failed to record play history: {e}")
@@ -0,0 +1,87 @@
+"""Back-to-back playback, switching to a pre-armed next track without a gap"""
+
+import io
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from discord import AudioSource, FFmpegOpusAudio
+
+from src.utils import QueueItem
+
+
+@dataclass
+class Track:
+    """A track's audio source, with FFmpeg already started on its (cached or streamed) audio"""
+
+    item: QueueItem
+    source: FFmpegOpusAudio
+    reader: io.RawIOBase
+    offset: float = 0.0  # Seconds into the track that the source starts at
+
+    def close(self):
+        self.source.cleanup()
+        self.reader.close()
+
+
+class GaplessSource(AudioSource):
+    """Plays a track, then carries straight on with the next one if it was armed in time
+
+    The voice client's player thread reads a 20 ms frame at a time. When the current track runs
+    out, the same read returns the first frame of the armed track, whose FFmpeg process has
+    been running (and buffering) since it was armed, so the switch takes no longer than one
+    frame. Without an armed track, the source ends like any other.
+    """
+
+    def __init__(self, track: Track, on_switch: Callable[[Track, Track], None]):
+        self.track = track
+        # Called on the player thread with the ended track (for the caller to close, off that
+        # thread) and the one that took over
+        self.on_switch = on_switch
+        self._next: Track | None = None
+        self._skip = False
+        self._lock = threading.Lock()
+
+    def arm(self, track: Track | None) -> Track | None:
+        """Set the track to switch to (``None`` to disarm)
+
+        Returns the track armed before it, if any, for the caller to close off the event loop.
+        """
+        with self._lock:
+            previous, self._next = self._next, track
+        return previous
+
+    def replace(self, track: Track) -> Track:
+        """Swap in another track (e.g. the same one at another offset) from the next frame on
+
+        Returns the replaced track, for the caller to close off the player thread.
+        """
+        with self._lock:
+            replaced, self.track = self.track, track
+            self._skip = False
+        return replaced
+
+    def skip(self):
+        """End the current track at the next frame, switching to the armed track if any"""
+        with self._lock:
+            self._skip = True
+
+    def is_opus(self) -> bool:
+        return True
+
+    def read(self) -> bytes:
+        data = b"" if self._skip else self.track.source.read()
+        while not data:
+            with self._lock:
+                self._skip = False
+                if self._next is None:
+                    return b""
+                ended, self.track, self._next = self.track, self._next, None
+            self.on_switch(ended, self.track)
+            data = self.track.source.read()
+        return data
+
+    def cleanup(self):
+        if armed := self.arm(None):
+            armed.close()
+        self.track.close()
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from redis.asyncio.client import Pipeline
+
+from src.cache import AudioCache
+from src.utils import QueueItem
+
+log = logging.getLogger(__name__)
+
+# Writes made within this many seconds of each other are sent to Redis in one pipeline
+FLUSH_INTERVAL = 0.5
+
+# Placeholder for an item being removed from the middle of a saved queue
+REMOVED = "-"
+
+
+@dataclass
+class SavedPlayer:
+    guild_id: int
+    voice_channel_id: int | None = None
+    text_channel_id: int | None = None
+    current: QueueItem | None = None
+    offset: float = 0
+    queue: list[QueueItem] = field(default_factory=list)
+
+
+def dump_item(item: QueueItem) -> str:
+    """Compact serialisation of a queue item"""
+    return json.dumps([item.video_id, item.title, item.requested_by], separators=(",", ":"))
+
+
+def load_item(data: bytes) -> QueueItem:
+    video_id, title, requested_by = json.loads(data)
+    return QueueItem(video_id=video_id, title=title, requested_by=requested_by)
+
+
+def _int_or_none(value: bytes | None) -> int | None:
+    return int(value) if value else None
+
+
+class QueueStore:
+    """Persists each guild's queue & now-playing state to Redis, so it survives restarts
+
+    Every change is applied incrementally (e.g. a single RPUSH for a queued track), but
+    nothing is awaited by callers: changes are buffered and written in one pipeline at most
+    every :data:`FLUSH_INTERVAL` seconds, so persistence adds no latency to commands.
+    """
+
+    def __init__(self, cache: AudioCache):
+        self.redis = cache.redis
+        self.closed = False
+        self._pending: list[Callable[[Pipeline], None]] = []
+        self._flush_task: asyncio.Task | None = None
+
+    def append(self, guild_id: int, *items: QueueItem):
+        if items:
+            self._write(
+                lambda pipe: pipe.rpush(f"player:{guild_id}:queue", *map(dump_item, items))
+            )
+
+    def pop(self, guild_id: int):
+        self._write(lambda pipe: pipe.lpop(f"player:{guild_id}:queue"))
+
+    def remove(self, guild_id: int, index: int):
+        """Remove the item at a position, marking it with a placeholder and removing that"""
+        key = f"player:{guild_id}:queue"
+
+        def write(pipe: Pipeline):
+            pipe.lset(key, index, REMOVED)
+            pipe.lrem(key, 1, REMOVED)
+
+        self._write(write)
+
+    def replace(self, guild_id: int, items: list[QueueItem]):
+        """Rewrite a guild's whole queue (for bulk changes)"""
+
+        def write(pipe: Pipeline):
+            pipe.delete(f"player:{guild_id}:queue")
+            if items:
+                pipe.rpush(f"player:{guild_id}:queue", *map(dump_item, items))
+
+        self._write(write)
+
+    def set_current(
+        self,
+        guild_id: int,
+        item: QueueItem | None,
+        voice_channel_id: int | None = None,
+        text_channel_id: int | None = None,
+    ):
+        def write(pipe: Pipeline):
+            pipe.sadd("players", guild_id)
+            if item is None:
+                pipe.hdel(f"player:{guild_id}", "current", "offset")
+                return
+            mapping = {"current": dump_item(item), "offset": 0}
+            if voice_channel_id:
+                mapping["voice_channel"] = voice_channel_id
+            if text_channel_id:
+                mapping["text_channel"] = text_channel_id
+            pipe.hset(f"player:{guild_id}", mapping=mapping)
+
+        self._write(write)
+
+    def set_offset(self, guild_id: int, offset: float):
+        self._write(lambda pipe: pipe.hset(f"player:{guild_id}", "offset", f"{offset:.1f}"))
+
+    def clear(self, guild_id: int):
+        def write(pipe: Pipeline):
+            pipe.delete(f"player:{guild_id}", f"player:{guild_id}:queue")
+            pipe.srem("players", guild_id)
+
+        self._write(write)
+
+    async def load_all(self) -> list[SavedPlayer]:
+        """Load the saved state of every guild's player"""
+        guild_ids = [int(guild_id) for guild_id in await self.redis.smembers("players")]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for guild_id in guild_ids:
+                pipe.hgetall(f"player:{guild_id}")
+                pipe.lrange(f"player:{guild_id}:queue", 0, -1)
+            results = await pipe.execute()
+
+        saved = []
+        for guild_id, state, queue in zip(guild_ids, results[::2], results[1::2], strict=True):
+            saved.append(
+                SavedPlayer(
+                    guild_id=guild_id,
+                    voice_channel_id=_int_or_none(state.get(b"voice_channel")),
+                    text_channel_id=_int_or_none(state.get(b"text_channel")),
+                    current=load_item(state[b"current"]) if b"current" in state else None,
+                    offset=float(state.get(b"offset", 0)),
+                    queue=[load_item(item) for item in queue],
+                )
+            )
+        return saved
+
+    async def flush(self):
+        """Write all buffered changes now"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for write in pending:
+                write(pipe)
+            await pipe.execute()
+
+    async def close(self):
+        """Flush buffered changes, then ignore any further ones (e.g. made during shutdown)"""
+        self.closed = True
+        await self.flush()
+
+    def _write(self, write: Callable[[Pipeline], None]):
+        if self.closed:
+            return
+        self._pending.append(write)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(FLUSH_INTERVAL)
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            log.error(f"Failed to persist player state: {e}")
@@ -0,0 +1,529 @@
+import asyncio
+import io
+import logging
+import os
+import time
+from typing import TYPE_CHECKING
+
+from discord import (
+    Color,
+    Embed,
+    FFmpegOpusAudio,
+    Guild,
+    TextChannel,
+    VoiceChannel,
+    VoiceClient,
+    utils,
+)
+
+from src.activities import Activities
+from src.cache import OPUS_MIME_TYPE, AudioCache
+from src.cogs.music.gapless import GaplessSource, Track
+from src.cogs.music.persistence import QueueStore, SavedPlayer
+from src.cogs.music.queue import TrackQueue
+from src.downloader import Downloader
+from src.history import PlayHistory
+from src.metadata import TrackMetadata
+from src.metrics import PLAYBACK_START
+from src.playlist import (
+    PlaylistImport,
+    ProgressListener as ImportProgressListener,
+)
+from src.prefetcher import Prefetcher
+from src.streaming import STREAM_POLL, StreamReader
+from src.utils import QueueItem, human_time_duration
+
+if TYPE_CHECKING:
+    from src.bot import QuartzBot
+
+FFMPEG_OPTIONS = {
+    "options": "-vn",  # Disable video
+}
+
+# How often the playback position of the current track is saved
+OFFSET_SAVE_INTERVAL = 5
+
+# Start playing tracks that aren't cached yet as soon as their first audio is downloaded
+PROGRESSIVE_PLAYBACK = os.getenv("PROGRESSIVE_PLAYBACK", "1") == "1"
+
+log = logging.getLogger(__name__)
+
+
+class GuildPlayer:
+    """Queue, now-playing state & voice connection for a single guild
+
+    Each player is driven by its own task, which plays the queue one track at a time, so
+    guilds never share (or contend over) playback state.
+    """
+
+    def __init__(
+        self,
+        bot: "QuartzBot",
+        guild: Guild,
+        cache: AudioCache,
+        downloader: Downloader,
+        store: QueueStore,
+        history: PlayHistory,
+    ):
+        self.bot = bot
+        self.guild = guild
+        self.cache = cache
+        self.downloader = downloader
+        self.store = store
+        self.history = history
+        self.prefetcher = Prefetcher(cache, downloader)
+
+        self.queue = TrackQueue()
+        self.current: QueueItem | None = None
+        self.voice_channel: VoiceChannel | None = None
+        self.text_channel: TextChannel | None = None
+        self.imports: set[PlaylistImport] = set()
+
+        # Playback position tracking, in seconds into the current track
+        self._start_offset = 0.0
+        self._started_at = 0.0
+        self._paused_at: float | None = None
+
+        # Source playing on the voice client, the task arming it with the next track, and the
+        # track that took over from the last one without a gap, if it did
+        self._source: GaplessSource | None = None
+        self._arm_task: asyncio.Task | None = None
+        self._switched_to: QueueItem | None = None
+
+        self._queue_ready = asyncio.Event()
+        self._track_ended = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name=f"player-{guild.id}")
+
+    @property
+    def voice_client(self) -> VoiceClient | None:
+        return self.guild.voice_client
+
+    @property
+    def is_idle(self) -> bool:
+        return self.current is None and not self.queue
+
+    @property
+    def position(self) -> float:
+        """Seconds into the current track"""
+        if self.current is None:
+            return 0
+        now = self._paused_at or time.monotonic()
+        return self._start_offset + now - self._started_at
+
+    def enqueue(
+        self, item: QueueItem, voice_channel: VoiceChannel, text_channel: TextChannel
+    ) -> int:
+        """Add a track to the end of the queue, returning its position"""
+        self.voice_channel = voice_channel
+        self.text_channel = text_channel
+        self.queue.append(item)
+        self.store.append(self.guild.id, item)
+        self._queue_ready.set()
+        self._reschedule(len(self.queue) - 1)
+        return len(self.queue)
+
+    def import_playlist(
+        self,
+        url: str,
+        requested_by: str,
+        voice_channel: VoiceChannel,
+        text_channel: TextChannel,
+        on_progress: ImportProgressListener | None = None,
+    ) -> PlaylistImport:
+        """Start adding a playlist's tracks to the end of the queue, in the background"""
+
+        def enqueue(metadata: TrackMetadata):
+            item = QueueItem(metadata.video_id, metadata.title, requested_by)
+            self.enqueue(item, voice_channel, text_channel)
+
+        playlist = PlaylistImport(url, self.cache.metadata, enqueue, on_progress)
+        self.imports.add(playlist)
+        playlist.task.add_done_callback(lambda _: self.imports.discard(playlist))
+        return playlist
+
+    def remove(self, index: int) -> QueueItem:
+        """Remove the track at a (0-based) position in the queue"""
+        item = self.queue.pop(index)
+        self.store.remove(self.guild.id, index)
+        self._reschedule(index)
+        return item
+
+    def move(self, source: int, destination: int) -> QueueItem:
+        """Move a track to another (0-based) position in the queue"""
+        item = self.queue.move(source, destination)
+        self.store.replace(self.guild.id, list(self.queue))
+        self._reschedule(min(source, destination))
+        return item
+
+    def shuffle(self):
+        self.queue.shuffle()
+        self.store.replace(self.guild.id, list(self.queue))
+        self._reschedule(0)
+
+    def dedupe(self) -> int:
+        """Remove repeated tracks from the queue, returning how many were removed"""
+        if removed := self.queue.dedupe():
+            self.store.replace(self.guild.id, list(self.queue))
+            self._reschedule(0)
+        return removed
+
+    def _reschedule(self, changed_from: int):
+        """Re-plan prefetching if a change reached the part of the queue being warmed"""
+        if self.current and changed_from < self.prefetcher.depth:
+            self.prefetcher.schedule(self.queue)
+        if self.current and changed_from == 0:
+            self._arm_next()
+
+    def skip(self) -> bool:
+        """Stop the current track, letting the player move on to the next one"""
+        if not self.voice_client:
+            return False
+        if self.voice_client.is_playing() and self._source:
+            # Switches straight to the next track if it's armed
+            self._source.skip()
+            return True
+        if self.voice_client.is_playing() or self.voice_client.is_paused():
+            self.voice_client.stop()
+            return True
+        return False
+
+    def pause(self) -> bool:
+        if self.voice_client and self.voice_client.is_playing():
+            self.voice_client.pause()
+            self._paused_at = time.monotonic()
+            self.store.set_offset(self.guild.id, self.position)
+            return True
+        return False
+
+    def resume(self) -> bool:
+        if self.voice_client and self.voice_client.is_paused():
+            self.voice_client.resume()
+            # Paused outside of pause() (e.g. by the voice client itself), nothing to make up
+            if self._paused_at is not None:
+                self._started_at += time.monotonic() - self._paused_at
+                self._paused_at = None
+            return True
+        return False
+
+    async def seek(self, seconds: float) -> float | None:
+        """Jump to a point in the current track
+
+        :returns: The position playback continues from, or ``None`` if nothing is playing
+        """
+        item, source = self.current, self._source
+        if item is None or source is None:
+            return None
+        track = await self._open_track(item, max(seconds, 0.0))
+        if self.current is not item or self._source is not source or self._switched_to:
+            self._close(track)  # Moved on to another track in the meantime
+            return None
+
+        self._close(source.replace(track))
+        now = time.monotonic()
+        self._started_at = now - track.offset
+        if self._paused_at:
+            self._paused_at = now
+        self.store.set_offset(self.guild.id, self.position)
+        return track.offset
+
+    def stop(self):
+        """Clear the queue and stop the current track"""
+        for playlist in list(self.imports):
+            playlist.cancel()
+        self.queue.clear()
+        self.store.replace(self.guild.id, [])
+        self.prefetcher.cancel()
+        self._arm_next()  # Disarms, with the queue empty
+        self.skip()
+
+    def restore(self, saved: SavedPlayer):
+        """Pick up where a saved player left off, resuming the current track at its offset"""
+        self.voice_channel = self.guild.get_channel(saved.voice_channel_id)
+        self.text_channel = self.guild.get_channel(saved.text_channel_id)
+        self.queue.extend(saved.queue)
+        if saved.current:
+            self.queue.appendleft(saved.current)
+            self._start_offset = saved.offset
+            # It's popped again once it starts playing
+            self.store.replace(self.guild.id, list(self.queue))
+        log.info(f"Restored player for {self.guild.name} with {len(self.queue)} tracks")
+        if self.queue:
+            self._queue_ready.set()
+
+    def close(self):
+        """Stop the player's task"""
+        for playlist in list(self.imports):
+            playlist.cancel()
+        self.prefetcher.cancel()
+        if self._arm_task:
+            self._arm_task.cancel()
+        if self._source and (armed := self._source.arm(None)):
+            self._close(armed)
+        self._task.cancel()
+
+    async def _run(self):
+        while True:
+            if self._switched_to:
+                # Already playing, having taken over from the last track without a gap
+                item, self._switched_to = self._switched_to, None
+                self._take(item)
+                self._start(item, self.voice_client)
+                self.prefetcher.schedule(self.queue)
+            else:
+                if not self.queue:
+                    if self.current:
+                        self.current = None
+                        self.store.set_current(self.guild.id, None)
+                    self._queue_ready.clear()
+                    await self._queue_ready.wait()
+                    continue
+
+                item = self.queue.popleft()
+                self.store.pop(self.guild.id)
+                # Warm what comes next while this track plays
+                self.prefetcher.schedule(self.queue)
+                try:
+                    await self._play(item)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.exception(
+                        f"Failed to play video {item.video_id} in {self.guild.name}: {e}"
+                    )
+                    if self.text_channel:
+                        await self.text_channel.send(f"❌ Failed to play __{item.title}__: `{e}`")
+                    continue
+
+            self._arm_next()
+            await self._announce(item)
+            started_at, start_position = utils.utcnow(), self.position
+
+            # Save the playback position now and then, so a restart can resume mid-track
+            while not self._track_ended.is_set():
+                try:
+                    await asyncio.wait_for(self._track_ended.wait(), OFFSET_SAVE_INTERVAL)
+                except TimeoutError:
+                    self.store.set_offset(self.guild.id, self.position)
+
+            self.history.record(
+                self.guild.id,
+                item.requested_by,
+                item.video_id,
+                duration=self.position - start_position,
+                played_at=started_at,
+            )
+
+    async def _play(self, item: QueueItem):
+        """Start playing a track, returning once it has started"""
+        reached_at = time.perf_counter()
+        offset, self._start_offset = self._start_offset, 0.0
+        track = await self._open_track(item, offset)
+
+        # Connect to voice
+        try:
+            voice_client = self.voice_client
+            if voice_client is None:
+                voice_client = await self.voice_channel.connect()
+            elif self.voice_channel and voice_client.channel != self.voice_channel:
+                await voice_client.move_to(self.voice_channel)
+        except BaseException:
+            self._close(track)
+            raise
+
+        self._start(item, voice_client, track.offset)
+        self._source = GaplessSource(
+            track,
+            on_switch=lambda ended, started: self.bot.loop.call_soon_threadsafe(
+                self._on_switch, ended, started
+            ),
+        )
+        voice_client.play(
+            self._source,
+            after=lambda error: self.bot.loop.call_soon_threadsafe(self._on_track_end, error),
+        )
+        PLAYBACK_START.observe(
+            time.perf_counter() - reached_at,
+            "stream" if isinstance(track.reader, StreamReader) else "cache",
+        )
+
+    async def _open_track(self, item: QueueItem, offset: float = 0.0) -> Track:
+        """Start FFmpeg on a track's cached audio, ready to be played"""
+        # Get audio manifest from cache, downloading again if it was evicted since queueing
+        seek_index = None
+        if manifest := await self.cache.get_manifest(item.video_id):
+            if offset and manifest.is_opus:
+                seek_index = await self.cache.get_seek_index(item.video_id)
+            # Feed FFmpeg straight from the cache through its stdin pipe
+            reader = self.cache.open_reader(
+                item.video_id, manifest, self.bot.loop, seek_index, offset
+            )
+            is_opus = manifest.is_opus
+        else:
+            reader, is_opus = await self._open_download(item)
+
+        # Starting part way: the seek index takes the reader straight to the nearest page,
+        # otherwise FFmpeg has to read its way up to the offset
+        if seek_index:
+            offset, skip = reader.start_time, 0.0
+        else:
+            skip = offset
+
+        source = FFmpegOpusAudio(
+            reader,
+            pipe=True,
+            # Tracks cached as Ogg Opus (already levelled) are passed through, not re-encoded
+            codec="copy" if is_opus else None,
+            before_options=f"-ss {skip:.1f}" if skip else None,
+            **FFMPEG_OPTIONS,
+        )
+        return Track(item, source, reader, offset)
+
+    async def _open_download(self, item: QueueItem) -> tuple[io.RawIOBase, bool]:
+        """Download a track, returning a reader over its audio (and whether it's Opus)
+
+        In progressive mode, the reader follows the download from its first chunk on, rather
+        than waiting for the whole track to be cached.
+        """
+        job = self.downloader.download(item.video_id, item.url, progressive=PROGRESSIVE_PLAYBACK)
+        while PROGRESSIVE_PLAYBACK and not job.future.done():
+            state = await self.cache.streams.wait(item.video_id, 0)
+            if state and state.writing and state.size:
+                try:
+                    reader = self.cache.open_stream(item.video_id, state, self.bot.loop)
+                except FileNotFoundError:
+                    continue  # Committed in the meantime, so the job is about to finish
+                job.future.add_done_callback(self._log_download_error)
+                return reader, state.mime_type == OPUS_MIME_TYPE
+            # Not announced yet (e.g. by an ingest job queued without announcements, in which
+            # case this waits for it to finish), or left over from an earlier download
+            await asyncio.wait([job.future], timeout=STREAM_POLL)
+
+        await job
+        manifest = await self.cache.get_manifest(item.video_id)
+        if not manifest:
+            raise ValueError("Audio data not found in cache")
+        return self.cache.open_reader(item.video_id, manifest, self.bot.loop), manifest.is_opus
+
+    @staticmethod
+    def _log_download_error(future: asyncio.Future):
+        if not future.cancelled() and (e := future.exception()):
+            log.error(f"Download failed while streaming: {e}")
+
+    def _start(self, item: QueueItem, voice_client: VoiceClient, offset: float = 0.0):
+        """Update currently playing"""
+        self.current = item
+        self._started_at, self._paused_at = time.monotonic() - offset, None
+        self._track_ended.clear()
+        self.store.set_current(
+            self.guild.id,
+            item,
+            voice_channel_id=voice_client.channel.id,
+            text_channel_id=self.text_channel.id if self.text_channel else None,
+        )
+
+    def _take(self, item: QueueItem):
+        """Remove a track that took over from the last one from the queue"""
+        if self.queue and self.queue[0] is item:
+            self.queue.popleft()
+            self.store.pop(self.guild.id)
+            return
+        # The queue changed just as it took over, so look for it (it plays even if removed)
+        for index, queued in enumerate(self.queue):
+            if queued is item:
+                self.queue.pop(index)
+                self.store.remove(self.guild.id, index)
+                return
+
+    def _arm_next(self):
+        """Have the next track ready to take over from the current one, as soon as it ends
+
+        FFmpeg is started on the next track straight away, so that it has audio buffered well
+        before it's needed, rather than starting up in the gap between tracks.
+        """
+        if self._arm_task and not self._arm_task.done():
+            self._arm_task.cancel()
+        self._arm_task = None
+        if self._source is None:
+            return
+        if armed := self._source.arm(None):
+            self._close(armed)
+        if self.queue:
+            self._arm_task = asyncio.create_task(self._arm(self._source, self.queue[0]))
+
+    async def _arm(self, source: GaplessSource, item: QueueItem):
+        try:
+            track = await self._open_track(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # It gets another go when it's reached
+            log.error(f"Failed to arm video {item.video_id} in {self.guild.name}: {e}")
+            return
+        if source is self._source and self.queue and self.queue[0] is item:
+            if armed := source.arm(track):
+                self._close(armed)
+            log.info(f"Armed video {item.video_id} to play next in {self.guild.name}")
+        else:
+            self._close(track)
+
+    async def _announce(self, item: QueueItem):
+        """Post the "Now Playing" embed & update the bot's presence"""
+        try:
+            # Cached at ingest, so this only reaches YouTube for tracks never seen before
+            meta = await self.cache.metadata.get(item.video_id, item.url)
+            if self.text_channel:
+                await self.text_channel.send(embed=self.now_playing_embed(item, meta))
+
+            await self.bot.change_presence(
+                **Activities.youtube(
+                    title=meta.title,
+                    url=meta.watch_url,
+                    author=meta.author,
+                    application_id=self.bot.application_id,
+                )
+            )
+        except Exception as e:
+            log.error(f"Failed to announce video {item.video_id} in {self.guild.name}: {e}")
+
+    def _on_track_end(self, error: Exception | None):
+        if error:
+            log.error(f"Player error in {self.guild.name}: {error}")
+        if self._arm_task and not self._arm_task.done():
+            self._arm_task.cancel()
+        self._source = None
+        self._track_ended.set()
+
+    def _on_switch(self, ended: Track, started: Track):
+        self._close(ended)
+        self._switched_to = started.item
+        self._track_ended.set()
+
+    def _close(self, track: Track):
+        """Close a track off the event loop, as stopping FFmpeg blocks until it exits"""
+        self.bot.loop.run_in_executor(None, track.close)
+
+    def now_playing_embed(self, item: QueueItem, meta: TrackMetadata) -> Embed:
+        """Construct the "Now Playing" embed for a track"""
+        embed = Embed(
+            title=meta.title,
+            description=f"**Author:** {meta.author}\n"
+            f"**Length:** {human_time_duration(meta.length)}\n"
+            f"**Uploaded:** {meta.publish_date}\n"
+            f"**Views:** {meta.views:,}\n",
+            color=Color.green(),
+            url=meta.embed_url,
+            timestamp=utils.utcnow(),
+        )
+        embed.set_thumbnail(url=meta.thumbnail_url)
+
+        # Get the requester info
+        requester = self.guild.get_member_named(item.requested_by)
+        embed.set_footer(
+            text=f"Requested by {item.requested_by}",
+            icon_url=requester.display_avatar.url if requester else None,
+        )
+        embed.set_author(
+            name="Now Playing",
+            icon_url="https://cdn-icons-png.flaticon.com/512/10181/10181264.png",
+        )
+        return embed
@@ -0,0 +1,178 @@
+"""Indexed track queue, cheap to edit and page through at any length"""
+
+import random
+from collections.abc import Iterable, Iterator
+from itertools import chain, islice
+
+from src.utils import QueueItem
+
+# Blocks are split once they grow past twice this size
+BLOCK_SIZE = 256
+
+
+class TrackQueue:
+    """Sequence of queue items stored as a list of blocks, indexed by block length
+
+    A Fenwick tree over the block lengths finds the block holding any position in
+    O(log n), so inserting, removing or moving an entry anywhere in the queue only shifts
+    items within one block, rather than the whole queue as with a ``list`` or ``deque``.
+    """
+
+    def __init__(self, items: Iterable[QueueItem] = (), block_size: int = BLOCK_SIZE):
+        self.block_size = block_size
+        self._blocks: list[list[QueueItem]] = []
+        self._tree: list[int] = [0]
+        self._len = 0
+        self._reset(list(items))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __iter__(self) -> Iterator[QueueItem]:
+        return chain.from_iterable(self._blocks)
+
+    def __getitem__(self, index: int | slice) -> QueueItem | list[QueueItem]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                raise ValueError("TrackQueue slices don't support steps")
+            return list(islice(self._iter_from(start), max(stop - start, 0)))
+
+        block, offset = self._locate(self._normalise(index))
+        return self._blocks[block][offset]
+
+    """"""
+
+    def append(self, item: QueueItem):
+        self.insert(self._len, item)
+
+    def appendleft(self, item: QueueItem):
+        self.insert(0, item)
+
+    def extend(self, items: Iterable[QueueItem]):
+        items = list(items)
+        if not items:
+            return
+        if self._blocks and len(self._blocks[-1]) < self.block_size:
+            room = self.block_size - len(self._blocks[-1])
+            self._blocks[-1].extend(items[:room])
+            items = items[room:]
+        self._blocks.extend(
+            items[i : i + self.block_size] for i in range(0, len(items), self.block_size)
+        )
+        self._rebuild_index()
+
+    def insert(self, index: int, item: QueueItem):
+        """Insert an item before ``index`` (clamped to the queue's bounds, like ``list``)"""
+        index = min(max(index + self._len if index < 0 else index, 0), self._len)
+        if not self._blocks:
+            self._blocks.append([item])
+            self._rebuild_index()
+            return
+
+        if index == self._len:
+            block, offset = len(self._blocks) - 1, len(self._blocks[-1])
+        else:
+            block, offset = self._locate(index)
+        self._blocks[block].insert(offset, item)
+        self._len += 1
+
+        if len(self._blocks[block]) > 2 * self.block_size:
+            items = self._blocks[block]
+            self._blocks[block : block + 1] = [items[: self.block_size], items[self.block_size :]]
+            self._rebuild_index()
+        else:
+            self._update(block, 1)
+
+    def pop(self, index: int = -1) -> QueueItem:
+        block, offset = self._locate(self._normalise(index))
+        item = self._blocks[block].pop(offset)
+        self._len -= 1
+        if self._blocks[block]:
+            self._update(block, -1)
+        else:
+            del self._blocks[block]
+            self._rebuild_index()
+        return item
+
+    def popleft(self) -> QueueItem:
+        return self.pop(0)
+
+    def move(self, source: int, destination: int) -> QueueItem:
+        """Move the item at ``source`` so that it ends up at ``destination``"""
+        item = self.pop(source)
+        self.insert(destination, item)
+        return item
+
+    def shuffle(self):
+        items = list(self)
+        random.shuffle(items)
+        self._reset(items)
+
+    def dedupe(self) -> int:
+        """Remove repeats of the same video, keeping the first. Returns the number removed"""
+        seen = set()
+        items = []
+        for item in self:
+            if item.video_id not in seen:
+                seen.add(item.video_id)
+                items.append(item)
+        removed = self._len - len(items)
+        if removed:
+            self._reset(items)
+        return removed
+
+    def clear(self):
+        self._reset([])
+
+    """"""
+
+    def _normalise(self, index: int) -> int:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("queue index out of range")
+        return index
+
+    def _iter_from(self, start: int) -> Iterator[QueueItem]:
+        if start >= self._len:
+            return iter(())
+        block, offset = self._locate(start)
+        return chain(
+            islice(self._blocks[block], offset, None),
+            chain.from_iterable(self._blocks[block + 1 :]),
+        )
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        """Find the block holding a position, and the position's offset within it"""
+        block, step = 0, 1 << (len(self._blocks).bit_length() - 1)
+        while step:
+            if block + step <= len(self._blocks) and self._tree[block + step] <= index:
+                block += step
+                index -= self._tree[block]
+            step >>= 1
+        return block, index
+
+    def _update(self, block: int, delta: int):
+        block += 1
+        while block < len(self._tree):
+            self._tree[block] += delta
+            block += block & -block
+
+    def _reset(self, items: list[QueueItem]):
+        self._blocks = [
+            items[i : i + self.block_size] for i in range(0, len(items), self.block_size)
+        ]
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        """Rebuild the Fenwick tree over the block lengths, in O(number of blocks)"""
+        tree = [0] + [len(block) for block in self._blocks]
+        for i in range(1, len(tree)):
+            if (parent := i + (i & -i)) < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._len = sum(len(block) for block in self._blocks)
@@ -1,7 +1,7 @@
 import logging
 from typing import TYPE_CHECKING
 
-from discord import Interaction, SelectOption, ui
+from discord import ButtonStyle, Interaction, SelectOption, ui
 
 from src.utils import human_time_duration
 
@@ -9,6 +9,10 @@ log = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
     from src.cogs.music.cog import MusicCog
+    from src.cogs.music.player import GuildPlayer
+
+# Queue entries shown per page of /queue
+QUEUE_PAGE_SIZE = 10
 
 
 class SongSelector(ui.View):
@@ -66,6 +70,64 @@ class SongSelect(ui.Select):
             )
 
 
+class QueueView(ui.View):
+    """Pages through a guild's queue, rendering only the page being shown"""
+
+    def __init__(self, player: "GuildPlayer"):
+        super().__init__(timeout=120)
+        self.player = player
+        self.page = 0
+        self.message = None
+        self._update_buttons()
+
+    @property
+    def page_count(self) -> int:
+        return max(-(-len(self.player.queue) // QUEUE_PAGE_SIZE), 1)
+
+    def render(self) -> str:
+        """Render the current page (re-reading the queue, so it is always up to date)"""
+        self.page = min(self.page, self.page_count - 1)
+        lines = []
+        if current := self.player.current:
+            lines.append(
+                f"🎵  Now Playing: __{current.title}__ `(requested by {current.requested_by})`"
+            )
+
+        if queue := self.player.queue:
+            start = self.page * QUEUE_PAGE_SIZE
+            lines.append(f"\n📋 __queue__ ({len(queue)} tracks)")
+            lines.extend(
+                f"{i}. {item.title} (requested by {item.requested_by})"
+                for i, item in enumerate(queue[start : start + QUEUE_PAGE_SIZE], start + 1)
+            )
+            lines.append(f"\n-# Page {self.page + 1}/{self.page_count}")
+        return "\n".join(lines) or "Nothing is playing or queued"
+
+    def _update_buttons(self):
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page >= self.page_count - 1
+
+    async def _show_page(self, interaction: Interaction, page: int):
+        self.page = page
+        content = self.render()
+        self._update_buttons()
+        await interaction.response.edit_message(content=content, view=self)
+
+    @ui.button(label="◀", style=ButtonStyle.secondary)
+    async def previous(self, interaction: Interaction, button: ui.Button):
+        await self._show_page(interaction, max(self.page - 1, 0))
+
+    @ui.button(label="▶", style=ButtonStyle.secondary)
+    async def next(self, interaction: Interaction, button: ui.Button):
+        await self._show_page(interaction, self.page + 1)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            await self.message.edit(view=self)
+
+
 class SongSearchModal(ui.Modal):
     def __init__(self, cog: "MusicCog", interaction: Interaction):
         super().__init__(
@@ -0,0 +1,306 @@
+"""Size-bounded, memory-mapped LRU of cached audio on local disk"""
+
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from uuid import uuid4
+
+log = logging.getLogger(__name__)
+
+# Lives on the db-data volume, so it survives container restarts
+DISK_CACHE_DIR = os.getenv("DISK_CACHE_DIR", "/app/data/audio")
+DISK_CACHE_SIZE = int(os.getenv("DISK_CACHE_MB", "2048")) * 1024 * 1024
+
+# Hand downloads to ingest worker processes rather than running them in the bot process
+INGEST_WORKERS = os.getenv("INGEST_WORKERS", "0") == "1"
+
+# Where ingest workers leave finished tracks for bot processes to adopt into their disk cache
+INGEST_DIR = os.getenv("INGEST_DIR", "/app/data/ingest")
+
+# Seconds tracks are kept in the inbox after they're written, for bot processes to adopt, and
+# the size the inbox is pruned to (oldest tracks first) within that time
+INGEST_RETENTION = int(os.getenv("INGEST_RETENTION_HOURS", "24")) * 60 * 60
+INGEST_DIR_SIZE = int(os.getenv("INGEST_DIR_MB", "2048")) * 1024 * 1024
+
+# Suffix for files that are still being written, or evicted but not yet demoted
+PARTIAL_SUFFIX = ".partial"
+DEMOTE_SUFFIX = ".demote"
+
+_disk_cache: "DiskCache | None" = None
+
+
+def get_disk_cache() -> "DiskCache":
+    """Get the shared disk cache, scanning its directory on first use
+
+    Like the Redis pool, this is shared across cog reloads so that there is only ever one
+    in-memory LRU index for the directory.
+    """
+    global _disk_cache
+    if _disk_cache is None:
+        inbox = INGEST_DIR if INGEST_WORKERS else None
+        _disk_cache = DiskCache(DISK_CACHE_DIR, DISK_CACHE_SIZE, inbox=inbox)
+    return _disk_cache
+
+
+@dataclass
+class DiskEntry:
+    size: int
+    extension: str
+
+
+class DiskCache:
+    """LRU of whole tracks stored one file per video, read back through ``mmap``
+
+    The LRU order is kept in memory and persisted through file modification times, so it can
+    be rebuilt from the directory alone after a restart. All methods are thread-safe, so
+    blocking readers can read straight from disk without a hop through the event loop.
+    """
+
+    def __init__(self, directory: str, max_size: int, inbox: str | None = None):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        # Where ingest workers leave tracks for this cache to adopt, if they're in use
+        self.inbox = Path(inbox) if inbox else None
+        self.size = 0
+        self._entries: OrderedDict[str, DiskEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def video_ids(self) -> list[str]:
+        """IDs of every track on disk, least recently used first"""
+        with self._lock:
+            return list(self._entries)
+
+    def get(self, video_id: str) -> DiskEntry | None:
+        """Get the entry for a video, if it is on disk"""
+        return self._entries.get(video_id)
+
+    def read(self, video_id: str, start: int, end: int) -> bytes | None:
+        """Read the byte range ``[start, end)`` of a track, marking it as recently used
+
+        :returns: The data, or ``None`` if the track isn't (or is no longer) on disk
+        """
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(video_id)
+            path = self._path(video_id, entry.extension)
+
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return m[start:end]
+        except (FileNotFoundError, ValueError):
+            return None  # Evicted since the lookup
+
+    def touch(self, video_id: str):
+        """Persist an entry's position in the LRU, so it survives a restart"""
+        if entry := self._entries.get(video_id):
+            try:
+                os.utime(self._path(video_id, entry.extension))
+            except FileNotFoundError:
+                pass
+
+    def open_writer(self, video_id: str, extension: str) -> "DiskWriter":
+        """Open a writer for a new track, added to the LRU once committed"""
+        return DiskWriter(self, video_id, extension)
+
+    def add(self, video_id: str, extension: str, partial_path: Path) -> list[Path]:
+        """Move a fully written file into the cache, evicting the least recently used tracks
+
+        :returns: Paths of evicted files, left on disk (renamed) for the caller to demote to the
+            next tier and then delete
+        """
+        path = self._path(video_id, extension)
+        os.replace(partial_path, path)
+        size = path.stat().st_size
+
+        with self._lock:
+            if old := self._entries.pop(video_id, None):
+                self.size -= old.size
+            self._entries[video_id] = DiskEntry(size, extension)
+            self.size += size
+
+            evicted = []
+            while self.size > self.max_size and len(self._entries) > 1:
+                old_id, old = self._entries.popitem(last=False)
+                self.size -= old.size
+                old_path = self._path(old_id, old.extension)
+                demote_path = old_path.with_name(old_path.name + DEMOTE_SUFFIX)
+                os.replace(old_path, demote_path)
+                evicted.append(demote_path)
+
+        if evicted:
+            log.info(f"Disk cache full, evicted {len(evicted)} tracks")
+        return evicted
+
+    def adopt(self, video_id: str) -> list[Path] | None:
+        """Link a track left in the inbox by an ingest worker into the cache
+
+        The inbox keeps the track (until it's pruned), so that every other process looking it
+        up, e.g. those of other shards, can adopt it too.
+
+        :returns: Paths of tracks evicted to make room (as for :meth:`add`), or ``None`` if the
+            inbox doesn't have the track
+        """
+        if self.inbox is None:
+            return None
+        for path in self.inbox.glob(f"{video_id}.*"):
+            if path.suffix == PARTIAL_SUFFIX:
+                continue  # Still being written
+            # Named uniquely, as lookups of the same track may adopt it at the same time
+            partial_path = self.directory / f"{path.name}.{uuid4().hex[:8]}{PARTIAL_SUFFIX}"
+            try:
+                try:
+                    os.link(path, partial_path)
+                except OSError:
+                    shutil.copyfile(path, partial_path)  # e.g. on another filesystem
+            except FileNotFoundError:
+                partial_path.unlink(missing_ok=True)
+                return None  # Pruned since
+            return self.add(video_id, path.suffix.lstrip("."), partial_path)
+        return None
+
+    def remove(self, video_id: str):
+        """Delete a track from disk"""
+        with self._lock:
+            entry = self._entries.pop(video_id, None)
+            if entry is None:
+                return
+            self.size -= entry.size
+        self._path(video_id, entry.extension).unlink(missing_ok=True)
+
+    def _path(self, video_id: str, extension: str) -> Path:
+        return self.directory / f"{video_id}.{extension}"
+
+    def _load(self):
+        """Rebuild the LRU index from the directory, oldest modification time first"""
+        files = []
+        for path in self.directory.iterdir():
+            if not path.is_file():
+                continue  # e.g. the directories of other processes' disk caches
+            if path.name.endswith((PARTIAL_SUFFIX, DEMOTE_SUFFIX)):
+                # Left behind by a crash, never committed or never demoted
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            files.append((stat.st_mtime, path.stem, path.suffix.lstrip("."), stat.st_size))
+
+        for _, video_id, extension, size in sorted(files):
+            self._entries[video_id] = DiskEntry(size, extension)
+            self.size += size
+
+        log.info(
+            f"Disk cache loaded: {len(self._entries)} tracks, "
+            f"{self.size / 1024 / 1024:.1f}/{self.max_size / 1024 / 1024:.0f} MB"
+        )
+
+
+class DiskWriter:
+    """Writes a new track to a temporary file, moved into the cache on :meth:`commit`"""
+
+    def __init__(self, disk: "DiskCache | DiskInbox", video_id: str, extension: str):
+        self.disk = disk
+        self.video_id = video_id
+        self.extension = extension
+        self.path = disk.directory / f"{video_id}.{extension}{PARTIAL_SUFFIX}"
+        self._file = open(self.path, "wb")
+
+    def write(self, data: bytes):
+        self._file.write(data)
+        self._file.flush()  # Progressive readers follow the file as it's written
+
+    def commit(self) -> list[Path]:
+        """Add the file to the cache, returning the paths of any tracks evicted to make room"""
+        self._file.close()
+        return self.disk.add(self.video_id, self.extension, self.path)
+
+    def abort(self):
+        self._file.close()
+        self.path.unlink(missing_ok=True)
+
+
+class DiskInbox:
+    """Write-only disk tier for ingest workers, whose tracks are adopted by bot processes
+
+    Stands in for a :class:`DiskCache` in a worker's :class:`~src.cache.AudioCache`: tracks
+    are written to the inbox directory, but never read back, evicted or demoted by the worker.
+    Tracks are instead pruned by age and total size, as every track written is.
+    """
+
+    inbox = None  # Tracks are only ever adopted from an inbox, not into one
+
+    def __init__(
+        self,
+        directory: str = INGEST_DIR,
+        max_size: int = INGEST_DIR_SIZE,
+        retention: float = INGEST_RETENTION,
+    ):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.retention = retention
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prune()
+
+    def __contains__(self, video_id: str) -> bool:
+        return False
+
+    def get(self, video_id: str) -> None:
+        return None
+
+    def read(self, video_id: str, start: int, end: int) -> None:
+        return None
+
+    def touch(self, video_id: str):
+        pass
+
+    def remove(self, video_id: str):
+        for path in self.directory.glob(f"{video_id}.*"):
+            path.unlink(missing_ok=True)
+
+    def open_writer(self, video_id: str, extension: str) -> DiskWriter:
+        return DiskWriter(self, video_id, extension)
+
+    def add(self, video_id: str, extension: str, partial_path: Path) -> list[Path]:
+        os.replace(partial_path, self.directory / f"{video_id}.{extension}")
+        self.prune()
+        return []
+
+    def prune(self):
+        """Delete tracks older than the retention time, then the oldest beyond the size limit
+
+        Files still being written are left alone, unless they're as old (i.e. were left behind
+        by a crash), as other workers sharing the inbox may be writing them.
+        """
+        cutoff = time.time() - self.retention
+        files = []
+        for path in self.directory.iterdir():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # Pruned by another worker
+            if stat.st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+            elif path.suffix != PARTIAL_SUFFIX:
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, path in sorted(files):
+            if size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            size -= file_size
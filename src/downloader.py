@@ -0,0 +1,287 @@
+"""Audio downloads, run off the event loop in a bounded worker pool"""
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+from pytubefix import YouTube, request
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError
+
+from src.cache import OPUS_MIME_TYPE, AudioCache, AudioWriter
+from src.loudness import NORMALIZE_LOUDNESS, Loudness
+from src.metadata import TrackMetadata
+from src.streaming import DONE
+from src.transcoder import READ_SIZE, transcode_to_opus
+
+log = logging.getLogger(__name__)
+
+# Maximum number of downloads running at once
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "2"))
+
+# Minimum number of seconds between progress events for a single download
+PROGRESS_INTERVAL = 1.5
+
+# Seconds a download lock is held for without being renewed, before other processes may take
+# it over (e.g. if the process holding it died). Renewed as the download progresses
+LOCK_TIMEOUT = 60
+
+# Seconds to wait for another process to finish downloading the same video, and between checks
+# on whether it has
+LOCK_WAIT = 15 * 60
+LOCK_POLL = 1
+
+
+@dataclass
+class DownloadProgress:
+    video_id: str
+    title: str
+    bytes_downloaded: int
+    total_bytes: int
+
+    @property
+    def percent(self) -> float:
+        return (self.bytes_downloaded / self.total_bytes) * 100 if self.total_bytes else 0
+
+    @property
+    def completed(self) -> bool:
+        return self.bytes_downloaded >= self.total_bytes
+
+
+ProgressListener = Callable[[DownloadProgress], Awaitable[None]]
+
+
+class DownloadLockedError(Exception):
+    """Raised when another process is already downloading a video"""
+
+
+class DownloadJob:
+    """A single download running in the worker pool
+
+    Await the job to get the downloaded track's title once it has been cached.
+    """
+
+    def __init__(self, video_id: str, url: str, loop: asyncio.AbstractEventLoop):
+        self.video_id = video_id
+        self.url = url
+        self.loop = loop
+        self.future: asyncio.Future[str] = loop.create_future()
+        self.progress: DownloadProgress | None = None
+        # Whether anyone wants to play the track while it downloads (see AudioWriter)
+        self.progressive = False
+        self._listeners: list[ProgressListener] = []
+        self._last_report = 0.0
+
+    def __await__(self):
+        # Shield the shared future so one waiter being cancelled doesn't cancel the download
+        return asyncio.shield(self.future).__await__()
+
+    def add_progress_listener(self, listener: ProgressListener):
+        """Register a coroutine function called (throttled) with :class:`DownloadProgress`"""
+        self._listeners.append(listener)
+        # Waiters joining a download already in flight get the latest progress straight away
+        if self.progress:
+            self.loop.create_task(listener(self.progress)).add_done_callback(
+                self._log_listener_error
+            )
+
+    def report(self, progress: DownloadProgress):
+        """Record progress from the worker thread, notifying listeners at most every interval"""
+        self.progress = progress
+        now = time.monotonic()
+        if progress.completed or now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            self.loop.call_soon_threadsafe(self._dispatch, progress)
+
+    def _dispatch(self, progress: DownloadProgress):
+        log.info(f"Download progress for video {self.video_id}: {progress.percent:.1f}%")
+        for listener in self._listeners:
+            task = self.loop.create_task(listener(progress))
+            task.add_done_callback(self._log_listener_error)
+
+    @staticmethod
+    def _log_listener_error(task: asyncio.Task):
+        if not task.cancelled() and (e := task.exception()):
+            log.error(f"Download progress listener failed: {e}")
+
+
+class Downloader:
+    def __init__(self, cache: AudioCache, max_workers: int = DOWNLOAD_WORKERS):
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download")
+        self._jobs: dict[str, DownloadJob] = {}
+
+    def download(self, video_id: str, url: str, progressive: bool = False) -> DownloadJob:
+        """Queue a download into the cache, returning a job that can be awaited
+
+        Downloads are single-flight: while a video is being downloaded, further requests for it
+        share the in-flight job (and its single cache write) rather than starting another.
+
+        :param progressive: Announce the download's progress as it's cached, so that it can be
+            played before it finishes. A request joining a download in flight turns this on
+            from then on.
+        """
+        if job := self._jobs.get(video_id):
+            log.info(f"Joining in-flight download for video {video_id}")
+            job.progressive |= progressive
+            return job
+
+        loop = asyncio.get_running_loop()
+        job = DownloadJob(video_id, url, loop)
+        job.progressive = progressive
+        self._jobs[video_id] = job
+
+        def on_done(future: asyncio.Future):
+            del self._jobs[video_id]
+            if future.cancelled():
+                job.future.cancel()
+            elif e := future.exception():
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(future.result())
+
+        loop.create_task(self._run(job)).add_done_callback(on_done)
+        return job
+
+    def shutdown(self):
+        """Stop accepting downloads, abandoning any that haven't started yet"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, job: DownloadJob) -> str:
+        """Download a track into the cache in the worker pool
+
+        Downloads are also single-flight across processes sharing the cache: a Redis lock per
+        video makes any other process wait for the download, then use the cached result (or
+        take over, if it failed). The wait happens here on the event loop, so that downloads of
+        other videos can have the worker pool meanwhile.
+        """
+        deadline = time.monotonic() + LOCK_WAIT
+        while True:
+            try:
+                return await job.loop.run_in_executor(self.executor, self._run_locked, job)
+            except DownloadLockedError:
+                log.info(f"Waiting for another process to download video {job.video_id}")
+            while await self.cache.redis.exists(f"lock:download:{job.video_id}"):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for another download of {job.video_id}")
+                await asyncio.sleep(LOCK_POLL)
+
+    def _run_locked(self, job: DownloadJob) -> str:
+        """Download a track into the cache under its lock (runs in a worker thread)
+
+        :raises DownloadLockedError: If another process holds the lock
+        """
+
+        def call(coro):
+            # Cache writes still happen on the event loop; this thread just waits for them
+            return asyncio.run_coroutine_threadsafe(coro, job.loop).result()
+
+        # A previous job may have landed between the caller's cache miss and this one starting
+        if call(self.cache.get_manifest(job.video_id)):
+            log.info(f"Video {job.video_id} was cached while queued, skipping download")
+            return call(self.cache.get_title(job.video_id))
+
+        lock = self.cache.redis.lock(f"lock:download:{job.video_id}", timeout=LOCK_TIMEOUT)
+        if not call(lock.acquire(blocking=False)):
+            raise DownloadLockedError(f"Video {job.video_id} is being downloaded elsewhere")
+        try:
+            # Another process may have downloaded it while this one waited for the lock
+            if call(self.cache.get_manifest(job.video_id)):
+                log.info(f"Video {job.video_id} was downloaded by another process")
+                return call(self.cache.get_title(job.video_id))
+            return self._download(job, call, lock)
+        finally:
+            try:
+                call(lock.release())
+            except LockError:
+                log.warning(f"Download lock for video {job.video_id} expired before release")
+
+    def _download(self, job: DownloadJob, call: Callable, lock: Lock) -> str:
+        """Download & transcode a track into the cache, renewing its lock as it goes"""
+        yt = YouTube(job.url)
+        title = yt.title
+
+        # Store everything embeds & dashboards need now, while the YouTube object is at hand
+        call(self.cache.metadata.put(TrackMetadata.from_youtube(yt)))
+
+        # Prefer Opus streams, which only need remuxing rather than re-encoding
+        audio_streams = yt.streams.filter(only_audio=True)
+        stream = (
+            audio_streams.filter(audio_codec="opus").order_by("abr").desc().first()
+            or audio_streams.order_by("abr").desc().first()
+        )
+        log.info(f"Highest quality audio stream found: {stream}")
+
+        def download_chunks():
+            bytes_downloaded = 0
+            for chunk in request.stream(stream.url):
+                bytes_downloaded += len(chunk)
+                job.report(
+                    DownloadProgress(job.video_id, title, bytes_downloaded, stream.filesize)
+                )
+                yield chunk
+
+        writer = self.cache.open_writer(
+            job.video_id,
+            mime_type=OPUS_MIME_TYPE,
+            expected_size=stream.filesize,
+            progressive=job.progressive,
+        )
+        try:
+            # Convert to Ogg Opus once, streaming the result straight into the cache, and
+            # measure loudness on the way so playback never has to analyse the track
+            measured: list[Loudness] = []
+            for data in transcode_to_opus(
+                self._renewing(download_chunks(), lock, call),
+                passthrough=stream.audio_codec == "opus",
+                on_loudness=measured.append,
+            ):
+                if job.progressive and not writer.progressive:
+                    writer.make_progressive()  # A player joined the download since it started
+                call(writer.write(data))
+            loudness = measured[0] if measured else None
+
+            if NORMALIZE_LOUDNESS and loudness and (gain := loudness.gain()):
+                # Replaced before it's committed, so that only anyone playing the download as it
+                # was written hears it unlevelled, and playback always passes cached tracks through
+                with call(writer.open_written()) as source:
+                    call(writer.abort(state=DONE))
+                    writer = self.cache.open_writer(
+                        job.video_id, mime_type=OPUS_MIME_TYPE, expected_size=writer.size
+                    )
+                    chunks = iter(partial(source.read, READ_SIZE), b"")
+                    loudness = self._level(self._renewing(chunks, lock, call), gain, writer, call)
+
+            call(writer.commit(title=title, loudness=loudness))
+        finally:
+            if not writer.committed:
+                call(writer.abort())
+
+        log.info(f"Download completed for video {job.video_id}")
+        return title
+
+    @staticmethod
+    def _level(
+        chunks: Iterable[bytes], gain: float, writer: AudioWriter, call: Callable
+    ) -> Loudness | None:
+        """Re-encode a track at a fixed gain into the cache, returning its new loudness"""
+        measured: list[Loudness] = []
+        for data in transcode_to_opus(chunks, gain=gain, on_loudness=measured.append):
+            call(writer.write(data))
+        log.info(f"Levelled video {writer.video_id} by {gain:+.1f} dB")
+        return measured[0] if measured else None
+
+    @staticmethod
+    def _renewing(chunks: Iterable[bytes], lock: Lock, call: Callable) -> Iterator[bytes]:
+        """Pass chunks through, renewing the download lock on the way"""
+        renewed_at = time.monotonic()
+        for chunk in chunks:
+            if time.monotonic() - renewed_at > LOCK_TIMEOUT / 3:
+                call(lock.reacquire())
+                renewed_at = time.monotonic()
+            yield chunk
@@ -0,0 +1,104 @@
+"""Play history, recorded through a write-behind buffer"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from discord import utils
+from tortoise.functions import Count
+
+from src.models import PlayEvent
+
+log = logging.getLogger(__name__)
+
+# Buffered plays are written at most this many seconds after they are recorded
+FLUSH_INTERVAL = 30
+
+# Plays are written as soon as this many are buffered
+FLUSH_SIZE = 100
+
+# Plays kept in memory while the database can't be written to, beyond which the oldest go
+MAX_BUFFERED = 10_000
+
+
+class PlayHistory:
+    """Records every play without a database round trip per track
+
+    Plays are buffered in memory and inserted in batches, every :data:`FLUSH_INTERVAL`
+    seconds or once :data:`FLUSH_SIZE` have built up, whichever comes first.
+    """
+
+    def __init__(self):
+        self._buffer: list[PlayEvent] = []
+        self._flush_task: asyncio.Task | None = None
+
+    def record(
+        self,
+        guild_id: int,
+        user: str,
+        video_id: str,
+        duration: float,
+        played_at: datetime | None = None,
+    ):
+        """Buffer a play for writing"""
+        self._buffer.append(
+            PlayEvent(
+                guild_id=guild_id,
+                user=user,
+                video_id=video_id,
+                played_at=played_at or utils.utcnow(),
+                duration=duration,
+            )
+        )
+        if len(self._buffer) >= FLUSH_SIZE:
+            self._schedule_flush(0)
+        elif self._flush_task is None or self._flush_task.done():
+            self._schedule_flush(FLUSH_INTERVAL)
+
+    async def flush(self):
+        """Write all buffered plays now"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+
+        events, self._buffer = self._buffer, []
+        if not events:
+            return
+        try:
+            await PlayEvent.bulk_create(events, batch_size=FLUSH_SIZE)
+        except Exception:
+            # Keep them for the next flush, within reason
+            self._buffer = (events + self._buffer)[-MAX_BUFFERED:]
+            raise
+        log.info(f"Recorded {len(events)} plays")
+
+    async def most_played(
+        self, limit: int, since: timedelta | None = None, guild_id: int | None = None
+    ) -> list[tuple[str, int]]:
+        """Most played videos with their play counts, optionally within a window or guild"""
+        query = PlayEvent.all()
+        if since:
+            query = query.filter(played_at__gte=utils.utcnow() - since)
+        if guild_id:
+            query = query.filter(guild_id=guild_id)
+        rows = (
+            await query.annotate(plays=Count("id"))
+            .group_by("video_id")
+            .order_by("-plays")
+            .limit(limit)
+            .values("video_id", "plays")
+        )
+        return [(row["video_id"], row["plays"]) for row in rows]
+
+    def _schedule_flush(self, delay: float):
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = asyncio.create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            log.error(f"Failed to record play history: {e}")
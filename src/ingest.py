@@ -0,0 +1,284 @@
+"""Ingest workers: downloading & transcoding tracks in processes of their own
+
+Bot processes push jobs onto a Redis list, which any number of worker processes (started with
+``python -m src.ingest``) pull from. Workers write the results into the shared cache and
+publish progress & completion on a channel per video, which bot processes subscribe to.
+
+Each worker moves the jobs it takes onto a list of its own until they're done, and keeps a
+heartbeat alive while it runs. Jobs left on the list of a worker whose heartbeat lapsed (i.e.
+that crashed) are put back on the queue by the other workers, to be retried, including by the
+crashed worker itself once restarted (under a new ID).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+from dataclasses import asdict
+from uuid import uuid4
+
+from rich.console import Console
+from rich.logging import RichHandler
+
+from src.cache import AudioCache, close_pool
+from src.disk_cache import DiskInbox
+from src.downloader import DOWNLOAD_WORKERS, Downloader, DownloadJob, DownloadProgress
+
+log = logging.getLogger(__name__)
+
+# Seconds to wait for a worker to finish a job before giving up on it. Also how long a job
+# stays claimed, so that a job lost with a crashed worker can be queued again after this
+INGEST_TIMEOUT = int(os.getenv("INGEST_TIMEOUT", "900"))
+
+# Seconds a worker blocks waiting for a job, before checking whether it's shutting down
+POLL_TIMEOUT = 5
+
+# Seconds a worker's heartbeat lasts unless renewed, after which it's taken to have crashed
+HEARTBEAT_TIMEOUT = 30
+
+QUEUE_KEY = "ingest:jobs"
+# Jobs a worker has taken off the queue but not finished, and the worker's heartbeat
+PROCESSING_KEY = "ingest:processing:{worker_id}"
+HEARTBEAT_KEY = "ingest:worker:{worker_id}"
+EVENTS_CHANNEL = "ingest:events:{video_id}"
+
+
+class IngestError(Exception):
+    """Raised when an ingest worker fails to download a track"""
+
+
+class IngestClient:
+    """Drop-in for :class:`Downloader` that hands downloads to ingest worker processes
+
+    Jobs are single-flight within the process (as with the downloader) and across processes,
+    through a claim key per video: a process requesting a video that's already queued just
+    waits for the same completion event.
+    """
+
+    def __init__(self, cache: AudioCache):
+        self.cache = cache
+        self._jobs: dict[str, DownloadJob] = {}
+        self._pubsub = cache.redis.pubsub()
+        self._listener: asyncio.Task | None = None
+        self._subscribed: asyncio.Event | None = None
+
+    def download(self, video_id: str, url: str, progressive: bool = False) -> DownloadJob:
+        """Queue a download for a worker, returning a job that can be awaited
+
+        Unlike with the downloader, a request for progress announcements only reaches the worker
+        if it's made before the job is queued.
+        """
+        if job := self._jobs.get(video_id):
+            log.info(f"Joining in-flight ingest job for video {video_id}")
+            job.progressive |= progressive
+            return job
+
+        loop = asyncio.get_running_loop()
+        job = DownloadJob(video_id, url, loop)
+        job.progressive = progressive
+        self._jobs[video_id] = job
+        job.future.add_done_callback(lambda _: self._jobs.pop(video_id, None))
+
+        def on_done(task: asyncio.Task):
+            if job.future.done():
+                return
+            if task.cancelled():
+                job.future.cancel()
+            elif e := task.exception():
+                job.future.set_exception(e)
+
+        loop.create_task(self._submit(job)).add_done_callback(on_done)
+        return job
+
+    def shutdown(self):
+        """Stop listening for completions, failing any jobs still waiting on one"""
+        if self._listener:
+            self._listener.cancel()
+        for job in list(self._jobs.values()):
+            job.future.cancel()
+        asyncio.get_running_loop().create_task(self._pubsub.aclose())
+
+    async def _submit(self, job: DownloadJob):
+        # Subscribe before checking the cache, so a job finishing in between isn't missed
+        await self._listen()
+        if await self.cache.get_manifest(job.video_id):
+            log.info(f"Video {job.video_id} was cached while queued, skipping ingest")
+            job.future.set_result(await self.cache.get_title(job.video_id))
+            return
+
+        claimed = await self.cache.redis.set(
+            f"ingest:claim:{job.video_id}", 1, nx=True, ex=INGEST_TIMEOUT
+        )
+        if claimed:
+            payload = {"video_id": job.video_id, "url": job.url, "progressive": job.progressive}
+            await self.cache.redis.lpush(QUEUE_KEY, json.dumps(payload))
+            log.info(f"Queued ingest job for video {job.video_id}")
+        else:
+            log.info(f"Waiting on another process' ingest job for video {job.video_id}")
+
+        try:
+            await asyncio.wait_for(asyncio.shield(job.future), INGEST_TIMEOUT)
+        except TimeoutError:
+            # The completion event may have been lost, e.g. over a Redis reconnect
+            if await self.cache.get_manifest(job.video_id):
+                job.future.set_result(await self.cache.get_title(job.video_id))
+            else:
+                raise IngestError(
+                    f"Timed out waiting for video {job.video_id} to be ingested"
+                ) from None
+
+    async def _listen(self):
+        """Subscribe to completion events, once"""
+        if self._subscribed is None:
+            self._subscribed = asyncio.Event()
+            self._listener = asyncio.create_task(self._run_listener())
+        await self._subscribed.wait()
+
+    async def _run_listener(self):
+        await self._pubsub.psubscribe(EVENTS_CHANNEL.format(video_id="*"))
+        self._subscribed.set()
+        async for message in self._pubsub.listen():
+            if message["type"] != "pmessage":
+                continue
+            video_id = message["channel"].decode().rsplit(":", 1)[1]
+            if (job := self._jobs.get(video_id)) is None or job.future.done():
+                continue
+            try:
+                self._handle(job, json.loads(message["data"]))
+            except Exception as e:
+                log.error(f"Bad ingest event for video {video_id}: {e}")
+
+    def _handle(self, job: DownloadJob, event: dict):
+        match event.pop("event"):
+            case "progress":
+                job.report(DownloadProgress(**event))
+            case "done":
+                job.future.set_result(event["title"])
+            case "error":
+                job.future.set_exception(IngestError(event["error"]))
+
+
+class IngestWorker:
+    """Pulls jobs off the queue and runs them through a local :class:`Downloader`"""
+
+    def __init__(self, cache: AudioCache, concurrency: int = DOWNLOAD_WORKERS):
+        self.cache = cache
+        self.concurrency = concurrency
+        self.downloader = Downloader(cache, max_workers=concurrency)
+        # Unique to this run, as a restarted container gets the same hostname & pid back
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self.stopping = False
+        self._processing = PROCESSING_KEY.format(worker_id=self.id)
+        self._heartbeat_key = HEARTBEAT_KEY.format(worker_id=self.id)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def run(self):
+        log.info(f"Ingest worker {self.id} started, {self.concurrency} jobs at a time")
+        await self._beat()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while not self.stopping:
+                await self._slots.acquire()
+                job = await self.cache.redis.blmove(
+                    QUEUE_KEY, self._processing, POLL_TIMEOUT, src="RIGHT", dest="LEFT"
+                )
+                if job is None:
+                    self._slots.release()
+                    continue
+                task = asyncio.create_task(self._process(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            # Let jobs already taken finish, rather than leave them for a retry
+            if self._tasks:
+                log.info(f"Finishing {len(self._tasks)} ingest jobs before exiting")
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            heartbeat.cancel()
+        await self.cache.redis.delete(self._heartbeat_key)
+        self.downloader.shutdown()
+
+    def stop(self):
+        self.stopping = True
+
+    async def _beat(self):
+        await self.cache.redis.set(self._heartbeat_key, 1, ex=HEARTBEAT_TIMEOUT)
+
+    async def _heartbeat(self):
+        """Keep this worker's heartbeat alive, and retry the jobs of any worker that crashed"""
+        while True:
+            try:
+                await self._recover()
+            except Exception as e:
+                log.error(f"Failed to recover jobs of crashed ingest workers: {e}")
+            await asyncio.sleep(HEARTBEAT_TIMEOUT / 3)
+            try:
+                await self._beat()
+            except Exception as e:
+                log.error(f"Failed to renew heartbeat of ingest worker {self.id}: {e}")
+
+    async def _recover(self):
+        """Put the unfinished jobs of workers whose heartbeat lapsed back on the queue"""
+        async for key in self.cache.redis.scan_iter(PROCESSING_KEY.format(worker_id="*")):
+            worker_id = key.decode().split(":", 2)[2]
+            if await self.cache.redis.exists(HEARTBEAT_KEY.format(worker_id=worker_id)):
+                continue
+            # Onto the end jobs are taken from, as they've been waiting the longest
+            recovered = 0
+            while await self.cache.redis.lmove(key, QUEUE_KEY, src="RIGHT", dest="RIGHT"):
+                recovered += 1
+            if recovered:
+                log.warning(f"Queued {recovered} jobs lost with ingest worker {worker_id} again")
+
+    async def _process(self, raw: bytes):
+        job = json.loads(raw)
+        video_id = job["video_id"]
+        channel = EVENTS_CHANNEL.format(video_id=video_id)
+
+        async def publish(**event):
+            await self.cache.redis.publish(channel, json.dumps(event))
+
+        async def on_progress(progress: DownloadProgress):
+            await publish(event="progress", **asdict(progress))
+
+        try:
+            download = self.downloader.download(
+                video_id, job["url"], progressive=job.get("progressive", False)
+            )
+            download.add_progress_listener(on_progress)
+            title = await download
+            await publish(event="done", title=title)
+        except Exception as e:
+            log.error(f"Ingest failed for video {video_id}: {e}")
+            await publish(event="error", error=str(e))
+        finally:
+            async with self.cache.redis.pipeline(transaction=False) as pipe:
+                pipe.lrem(self._processing, 1, raw)
+                pipe.delete(f"ingest:claim:{video_id}")
+                await pipe.execute()
+            self._slots.release()
+
+
+async def main():
+    worker = IngestWorker(AudioCache(disk=DiskInbox()))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await close_pool()
+    log.info("[bold bright_green]Ingest worker stopped[/]")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level="INFO",
+        format="%(message)s",
+        datefmt="[%X]",
+        handlers=[RichHandler(console=Console(width=120), markup=True, enable_link_path=False)],
+    )
+    asyncio.run(main())
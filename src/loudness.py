@@ -0,0 +1,59 @@
+"""Loudness of cached tracks, measured & levelled once at ingest"""
+
+import os
+import re
+from dataclasses import dataclass
+
+# Level each track to the target loudness as it's cached, so playback can pass it through
+NORMALIZE_LOUDNESS = os.getenv("NORMALIZE_LOUDNESS", "1") == "1"
+
+# Integrated loudness (in LUFS) tracks are levelled to
+LOUDNESS_TARGET = float(os.getenv("LOUDNESS_TARGET", "-14"))
+
+# Tracks within this many LU of the target are cached as they are, sparing them a re-encode
+LOUDNESS_TOLERANCE = 1.0
+
+# Tracks are never boosted beyond this true peak (in dBTP), to avoid clipping
+MAX_TRUE_PEAK = -1.0
+
+# Most a track is ever boosted by (in dB), so near-silent tracks aren't blown up
+MAX_BOOST = 12.0
+
+# FFmpeg filter measuring a track as it's transcoded (per-frame logging is kept below the
+# log level, leaving just the summary)
+EBUR128_FILTER = "ebur128=peak=true:framelog=verbose"
+
+_INTEGRATED_PATTERN = re.compile(r"I:\s+(-?inf|-?[\d.]+) LUFS")
+_PEAK_PATTERN = re.compile(r"Peak:\s+(-?inf|-?[\d.]+) dBFS")
+
+
+@dataclass
+class Loudness:
+    integrated: float  # LUFS
+    true_peak: float  # dBTP
+
+    @classmethod
+    def from_ebur128(cls, log: str) -> "Loudness | None":
+        """Read the measurement from the summary FFmpeg's ``ebur128`` filter logs at the end"""
+        integrated = _INTEGRATED_PATTERN.findall(log)
+        peak = _PEAK_PATTERN.findall(log)
+        if not (integrated and peak):
+            return None
+        return cls(integrated=float(integrated[-1]), true_peak=float(peak[-1]))
+
+    @classmethod
+    def from_redis(cls, data: dict[bytes, bytes]) -> "Loudness | None":
+        if not data:
+            return None
+        return cls(integrated=float(data[b"integrated"]), true_peak=float(data[b"true_peak"]))
+
+    def to_redis(self) -> dict[str, float]:
+        return {"integrated": self.integrated, "true_peak": self.true_peak}
+
+    def gain(self, target: float = LOUDNESS_TARGET) -> float:
+        """Gain (in dB) bringing the track to the target loudness, or 0 if it's close enough"""
+        gain = target - self.integrated
+        if gain > 0:
+            # Boost only as far as the peaks allow
+            gain = max(min(gain, MAX_TRUE_PEAK - self.true_peak, MAX_BOOST), 0.0)
+        return gain if abs(gain) >= LOUDNESS_TOLERANCE else 0.0
@@ -8,6 +8,8 @@ from rich.logging import RichHandler
 
 from src.activities import Activities
 from src.bot import QuartzBot
+from src.cache import close_pool
+from src.sharding import Supervisor, is_supervisor
 
 rich_handler = RichHandler(
     console=Console(width=120),
@@ -59,29 +61,29 @@ async def shutdown(signal, loop, bot):
             # Set shutdown status and cleanup
             await bot.change_presence(**Activities.shutdown())
 
+            # Save queues before stopping playback, which would otherwise advance them
+            if music_cog := bot.reloader.cogs.get("music"):
+                await music_cog.save_state()
+
             # Stop and disconnect voice clients
             for voice_client in bot.voice_clients:
                 if voice_client.is_playing():
                     voice_client.stop()
                 await voice_client.disconnect(force=True)
 
-            # Get music cog and cleanup temp files
-            music_cog = bot.reloader.cogs.get("MusicCog")
-            if music_cog and hasattr(music_cog, "cache"):
-                temp_dir = music_cog.cache.temp_dir
-                if os.path.exists(temp_dir):
-                    for temp_file in os.listdir(temp_dir):
-                        try:
-                            os.unlink(os.path.join(temp_dir, temp_file))
-                        except Exception as e:
-                            log.error(f"Failed to cleanup temp file: {e}")
-
             # Wait briefly for cleanup
             await asyncio.sleep(1)
 
             # Close database connection
             await bot.db.close()
 
+            # Close cache connections
+            await close_pool()
+
+            # Stop serving metrics
+            if bot.metrics_runner:
+                await bot.metrics_runner.cleanup()
+
             # Close bot connection
             await bot.close()
 
@@ -99,4 +101,8 @@ async def shutdown(signal, loop, bot):
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if is_supervisor():
+        # Run one bot process per group of shards instead
+        Supervisor().run()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,183 @@
+"""Cache of YouTube video metadata, so embeds & dashboards never wait on YouTube"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+
+from pytubefix import Search, YouTube
+from redis import asyncio as aioredis
+
+log = logging.getLogger(__name__)
+
+# Metadata older than this is still served, but refreshed in the background
+METADATA_TTL = int(os.getenv("METADATA_TTL_HOURS", "24")) * 60 * 60
+
+# Metadata not refreshed for this long expires from Redis altogether
+METADATA_MAX_AGE = 30 * 24 * 60 * 60
+
+# How long search results are reused for the same query
+SEARCH_TTL = int(os.getenv("SEARCH_TTL_HOURS", "6")) * 60 * 60
+
+
+@dataclass
+class TrackMetadata:
+    video_id: str
+    title: str
+    author: str
+    length: int
+    publish_date: str | None
+    views: int
+    thumbnail_url: str
+    fetched_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_youtube(cls, yt: YouTube) -> "TrackMetadata":
+        """Collect metadata from a :class:`YouTube` object (blocking, may hit the network)"""
+        return cls(
+            video_id=yt.video_id,
+            title=yt.title,
+            author=yt.author,
+            length=yt.length,
+            publish_date=yt.publish_date.date().isoformat() if yt.publish_date else None,
+            views=yt.views,
+            thumbnail_url=yt.thumbnail_url,
+        )
+
+    @classmethod
+    def from_redis(cls, data: dict[bytes, bytes]) -> "TrackMetadata | None":
+        if not data:
+            return None
+        data = {key.decode(): value.decode() for key, value in data.items()}
+        return cls(
+            video_id=data["video_id"],
+            title=data["title"],
+            author=data["author"],
+            length=int(data["length"]),
+            publish_date=data.get("publish_date") or None,
+            views=int(data["views"]),
+            thumbnail_url=data["thumbnail_url"],
+            fetched_at=float(data["fetched_at"]),
+        )
+
+    def to_redis(self) -> dict[str, str | int | float]:
+        return {key: "" if value is None else value for key, value in asdict(self).items()}
+
+    @property
+    def watch_url(self) -> str:
+        return f"https://youtube.com/watch?v={self.video_id}"
+
+    @property
+    def embed_url(self) -> str:
+        return f"https://www.youtube.com/embed/{self.video_id}"
+
+    @property
+    def is_stale(self) -> bool:
+        return time.time() - self.fetched_at > METADATA_TTL
+
+
+class MetadataCache:
+    """Metadata per video_id, stored as a Redis hash at ingest time
+
+    Stale entries are returned immediately while a refresh runs in the background
+    (stale-while-revalidate), so lookups only wait on YouTube for videos never seen before.
+    """
+
+    def __init__(self, redis: aioredis.Redis):
+        self.redis = redis
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    async def get(self, video_id: str, url: str | None = None) -> TrackMetadata | None:
+        """Get metadata for a video
+
+        :param video_id: YouTube video ID
+        :param url: Video URL, used to fetch metadata that is missing or stale. Without it,
+            only what is already cached is returned.
+        """
+        metadata = TrackMetadata.from_redis(await self.redis.hgetall(f"video:{video_id}:meta"))
+        if metadata is None:
+            return await self.refresh(video_id, url) if url else None
+
+        if metadata.is_stale and url:
+            log.info(f"Metadata for video {video_id} is stale, refreshing in the background")
+            self.refresh(video_id, url)
+        return metadata
+
+    def refresh(self, video_id: str, url: str) -> asyncio.Task:
+        """Fetch metadata from YouTube (off the event loop) and cache it
+
+        Concurrent refreshes of the same video share a single fetch.
+        """
+        if task := self._refreshing.get(video_id):
+            return task
+
+        async def fetch() -> TrackMetadata:
+            try:
+                metadata = await asyncio.to_thread(
+                    lambda: TrackMetadata.from_youtube(YouTube(url))
+                )
+                await self.put(metadata)
+                return metadata
+            finally:
+                del self._refreshing[video_id]
+
+        task = self._refreshing[video_id] = asyncio.create_task(fetch())
+        task.add_done_callback(self._log_refresh_error)
+        return task
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task):
+        if not task.cancelled() and (e := task.exception()):
+            log.error(f"Failed to fetch video metadata: {e}")
+
+    async def get_many(self, video_ids: list[str]) -> list[TrackMetadata | None]:
+        """Get cached metadata for several videos in a single round trip"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for video_id in video_ids:
+                pipe.hgetall(f"video:{video_id}:meta")
+            return [TrackMetadata.from_redis(data) for data in await pipe.execute()]
+
+    async def put(self, *metadata: TrackMetadata):
+        """Store metadata, resetting its expiry"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for item in metadata:
+                key = f"video:{item.video_id}:meta"
+                pipe.hset(key, mapping=item.to_redis())
+                pipe.expire(key, METADATA_MAX_AGE)
+            await pipe.execute()
+
+    async def search(self, query: str, limit: int = 7) -> list[TrackMetadata]:
+        """Search YouTube, reusing recent results for the same query
+
+        The search itself runs off the event loop, and each result's metadata (which pytubefix
+        otherwise fetches lazily, one video at a time) is fetched concurrently.
+        """
+        key = f"search:{' '.join(query.lower().split())}"
+        if video_ids := await self.redis.get(key):
+            results = await self.get_many(json.loads(video_ids))
+            if all(results):
+                log.info(f"[bright_green]Search cache hit for query: {query}[/]")
+                return results[:limit]
+
+        log.info(f"[yellow]Search cache miss for query: {query}[/]")
+        videos = await asyncio.to_thread(lambda: Search(query).videos[:limit])
+        hydrated = await asyncio.gather(
+            *(asyncio.to_thread(TrackMetadata.from_youtube, video) for video in videos),
+            return_exceptions=True,
+        )
+
+        results = []
+        for video, metadata in zip(videos, hydrated, strict=True):
+            if isinstance(metadata, Exception):
+                log.warning(f"Skipping search result {video.video_id}: {metadata}")
+            else:
+                results.append(metadata)
+
+        if results:
+            await self.put(*results)
+            await self.redis.set(
+                key, json.dumps([metadata.video_id for metadata in results]), ex=SEARCH_TTL
+            )
+        return results
@@ -0,0 +1,171 @@
+"""In-process cache metrics, exposed in the Prometheus text format"""
+
+import bisect
+import logging
+import os
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+# Port the /metrics endpoint listens on (0 to disable it)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+# Upper bounds (in seconds) of the playback start histogram buckets
+START_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        REGISTRY.append(self)
+
+    def _label_text(self, values: tuple[str, ...], **extra: str) -> str:
+        pairs = [*zip(self.labels, values, strict=True), *extra.items()]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{label}="{value}"' for label, value in pairs) + "}"
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, description, labels)
+        self.values: defaultdict[tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float = 1):
+        self.values[labels] += amount
+
+    def total(self, *labels: str) -> float:
+        return self.values.get(labels, 0)
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{self._label_text(labels)} {value:g}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = buckets
+        # Per label set: count per bucket (the last being +Inf), then the sum of observations
+        self.counts: dict[tuple[str, ...], list[int]] = {}
+        self.sums: defaultdict[tuple[str, ...], float] = defaultdict(float)
+
+    def observe(self, value: float, *labels: str):
+        counts = self.counts.setdefault(labels, [0] * (len(self.buckets) + 1))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        """Observe how long the block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def count(self, *labels: str) -> int:
+        return sum(self.counts.get(labels, ()))
+
+    def quantile(self, q: float, *labels: str) -> float | None:
+        """Estimate a quantile as the upper bound of the bucket it falls in"""
+        counts = self.counts.get(labels)
+        if not counts:
+            return None
+        target, seen = q * sum(counts), 0
+        for bound, count in zip((*self.buckets, float("inf")), counts, strict=True):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        for labels, counts in sorted(self.counts.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                yield f"{self.name}_bucket{self._label_text(labels, le=f'{bound}')} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(labels)} {self.sums[labels]:g}"
+            yield f"{self.name}_count{self._label_text(labels)} {cumulative}"
+
+
+# Metrics are module-level, so that they survive cog reloads
+REGISTRY: list[Metric] = []
+
+CACHE_LOOKUPS = Counter(
+    "quartzbot_cache_lookups_total", "Audio cache lookups, by the tier that served them", ("tier",)
+)
+CACHE_BYTES_READ = Counter(
+    "quartzbot_cache_read_bytes_total", "Bytes of audio read from the cache", ("tier",)
+)
+CACHE_BYTES_WRITTEN = Counter(
+    "quartzbot_cache_written_bytes_total", "Bytes of audio written to the cache", ("tier",)
+)
+CACHE_EVICTIONS = Counter(
+    "quartzbot_cache_evictions_total", "Tracks evicted from the cache", ("tier", "reason")
+)
+CACHE_ADMISSIONS = Counter(
+    "quartzbot_cache_admissions_total", "Redis admission decisions", ("result",)
+)
+CACHE_OOM_RETRIES = Counter(
+    "quartzbot_cache_oom_retries_total", "Redis writes retried after an OOM error"
+)
+REDIS_LATENCY = Histogram(
+    "quartzbot_redis_command_seconds", "Latency of Redis commands on audio", ("command",)
+)
+PLAYBACK_START = Histogram(
+    "quartzbot_playback_start_seconds",
+    "Time from a track being reached in the queue to its audio starting",
+    ("source",),
+    buckets=START_BUCKETS,
+)
+
+
+def render() -> str:
+    """Render every metric in the Prometheus text exposition format"""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+async def start_server(port: int = METRICS_PORT) -> web.AppRunner | None:
+    """Serve ``/metrics`` over HTTP for scraping"""
+    if not port:
+        return None
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, port=port).start()
+    log.info(f"Serving metrics on port {port}")
+    return runner
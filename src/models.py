@@ -56,3 +56,26 @@ class PersistentMessage(Model):
                 "message": self.message_id,
             }
         )
+
+
+class PlayEvent(Model):
+    """A track played in a guild, recorded once playback of it ends"""
+
+    id = fields.BigIntField(primary_key=True)
+    guild_id = fields.BigIntField()
+    user = fields.CharField(max_length=100)
+    video_id = fields.CharField(max_length=16)  # Indexed by the first composite index below
+    # Indexed on its own too, for windows over all guilds (neither composite index leads with it)
+    played_at = fields.DatetimeField(db_index=True)
+    duration = fields.FloatField()  # Seconds actually played
+
+    class Meta:
+        # Popularity queries: plays per video, overall or per guild, within a time window
+        indexes = (("video_id", "played_at"), ("guild_id", "played_at"))
+
+    def __str__(self):
+        return "Play of video: %(video_id)s in guild: %(guild_id)d at: %(played_at)s" % {
+            "video_id": self.video_id,
+            "guild_id": self.guild_id,
+            "played_at": self.played_at,
+        }
@@ -0,0 +1,124 @@
+"""Streaming import of YouTube playlists into a queue"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from itertools import islice
+
+from pytubefix import Playlist, extract
+
+from src.metadata import MetadataCache, TrackMetadata
+
+log = logging.getLogger(__name__)
+
+# Maximum number of playlist entries being resolved at once
+PLAYLIST_CONCURRENCY = int(os.getenv("PLAYLIST_CONCURRENCY", "4"))
+
+# Entries are listed in pages of this size (YouTube's own page size)
+PLAYLIST_PAGE_SIZE = 100
+
+# Minimum number of seconds between progress events for a single import
+PROGRESS_INTERVAL = 1.5
+
+
+@dataclass
+class ImportProgress:
+    title: str
+    queued: int
+    failed: int
+    completed: bool = False
+
+
+ProgressListener = Callable[[ImportProgress], Awaitable[None]]
+
+
+async def iter_playlist(playlist: Playlist) -> AsyncIterator[str]:
+    """Yield a playlist's video IDs, listing it a page at a time off the event loop"""
+    urls = iter(playlist.video_urls)
+    while page := await asyncio.to_thread(lambda: list(islice(urls, PLAYLIST_PAGE_SIZE))):
+        for url in page:
+            yield extract.video_id(url)
+
+
+class PlaylistImport:
+    """Resolves a playlist's entries in order and hands each one to ``enqueue``
+
+    Entries are streamed, so the first is queued (and starts playing) as soon as it has
+    been resolved, while the rest follow in the background. At most
+    :data:`PLAYLIST_CONCURRENCY` entries are resolved at once; audio is left for the
+    player's prefetcher to download as each entry comes up.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        metadata: MetadataCache,
+        enqueue: Callable[[TrackMetadata], None],
+        on_progress: ProgressListener | None = None,
+    ):
+        self.url = url
+        self.metadata = metadata
+        self.enqueue = enqueue
+        self.on_progress = on_progress
+        self.progress = ImportProgress(title="playlist", queued=0, failed=0)
+        self._last_report = 0.0
+        self.task = asyncio.create_task(self._run())
+
+    def __await__(self):
+        return self.task.__await__()
+
+    def cancel(self):
+        self.task.cancel()
+
+    async def _run(self):
+        playlist = Playlist(self.url)
+        self.progress.title = await asyncio.to_thread(lambda: playlist.title)
+        log.info(f"Importing playlist {self.progress.title}")
+
+        pending: deque[asyncio.Task] = deque()
+        try:
+            async for video_id in iter_playlist(playlist):
+                pending.append(asyncio.create_task(self._resolve(video_id)))
+                if len(pending) >= PLAYLIST_CONCURRENCY:
+                    await self._enqueue(pending.popleft())
+            while pending:
+                await self._enqueue(pending.popleft())
+        finally:
+            for task in pending:
+                task.cancel()
+
+        self.progress.completed = True
+        await self._report(force=True)
+        log.info(
+            f"Imported playlist {self.progress.title}: {self.progress.queued} queued, "
+            f"{self.progress.failed} failed"
+        )
+
+    async def _resolve(self, video_id: str) -> TrackMetadata:
+        return await self.metadata.get(video_id, f"https://youtube.com/watch?v={video_id}")
+
+    async def _enqueue(self, task: asyncio.Task):
+        try:
+            metadata = await task
+        except Exception as e:
+            # Private, deleted or region-locked videos
+            log.warning(f"Skipping playlist entry: {e}")
+            self.progress.failed += 1
+        else:
+            self.enqueue(metadata)
+            self.progress.queued += 1
+        await self._report()
+
+    async def _report(self, force: bool = False):
+        now = time.monotonic()
+        if not self.on_progress or (not force and now - self._last_report < PROGRESS_INTERVAL):
+            return
+        self._last_report = now
+        try:
+            await self.on_progress(self.progress)
+        except Exception as e:
+            log.error(f"Playlist progress listener failed: {e}")
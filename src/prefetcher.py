@@ -0,0 +1,96 @@
+"""Background warming of upcoming queue entries"""
+
+import asyncio
+import logging
+import os
+from collections.abc import Iterable
+from itertools import islice
+
+from src.cache import AudioCache
+from src.downloader import Downloader
+from src.utils import QueueItem
+
+log = logging.getLogger(__name__)
+
+# Number of upcoming queue entries to keep warm
+PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "3"))
+
+# Maximum number of bytes of upcoming audio to keep warm
+PREFETCH_BUDGET = int(os.getenv("PREFETCH_BUDGET_MB", "64")) * 1024 * 1024
+
+# Bitrate (in bits/s) assumed for entries that aren't cached yet, to check they fit the budget
+# before downloading them (YouTube's Opus streams, cached as they are, go up to about 160 kbps)
+ESTIMATED_BITRATE = 160_000
+
+
+class Prefetcher:
+    """Makes sure the next few queue entries are cached before they are reached
+
+    Entries that are still cached are touched so LRU eviction passes over them, while entries
+    that were evicted (even partially) are downloaded again, one at a time, until either
+    :data:`PREFETCH_DEPTH` entries or :data:`PREFETCH_BUDGET` bytes are warm. Entries too long
+    to fit in what's left of the budget (going by their length) are skipped rather than
+    downloaded. Metadata for each entry is warmed too.
+    """
+
+    def __init__(
+        self,
+        cache: AudioCache,
+        downloader: Downloader,
+        depth: int = PREFETCH_DEPTH,
+        budget: int = PREFETCH_BUDGET,
+    ):
+        self.cache = cache
+        self.downloader = downloader
+        self.depth = depth
+        self.budget = budget
+        self._task: asyncio.Task | None = None
+
+    def schedule(self, queue: Iterable[QueueItem]):
+        """Warm the start of the queue in the background, superseding any previous run"""
+        upcoming = list(islice(queue, self.depth))
+        self.cancel()
+        if upcoming:
+            self._task = asyncio.create_task(self._warm(upcoming))
+
+    def cancel(self):
+        """Stop warming (downloads already in flight still complete)"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _warm(self, upcoming: list[QueueItem]):
+        budget = self.budget
+        for item in upcoming:
+            try:
+                # Fetches metadata if missing, or refreshes it in the background if stale
+                metadata = await self.cache.metadata.get(item.video_id, item.url)
+
+                manifest = await self.cache.get_manifest(item.video_id)
+                if manifest and not await self.cache.touch(item.video_id, manifest):
+                    log.info(f"Prefetch: video {item.video_id} was partially evicted")
+                    await self.cache.evict(item.video_id)
+                    manifest = None
+
+                if not manifest:
+                    size = metadata.length * ESTIMATED_BITRATE // 8 if metadata else 0
+                    if size > budget:
+                        log.info(
+                            f"Prefetch: skipping upcoming video {item.video_id}, about "
+                            f"{size / 1024 / 1024:.0f} MB is more than the budget left"
+                        )
+                        continue
+                    log.info(f"Prefetch: downloading upcoming video {item.video_id}")
+                    await self.downloader.download(item.video_id, item.url)
+                    manifest = await self.cache.get_manifest(item.video_id)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Prefetch failed for video {item.video_id}: {e}")
+                continue
+
+            budget -= manifest.size if manifest else 0
+            if budget <= 0:
+                log.info("Prefetch budget exhausted")
+                break
@@ -4,6 +4,7 @@ import logging
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+from discord.utils import maybe_coroutine
 from watchfiles import awatch
 
 from src.activities import Activities
@@ -63,6 +64,10 @@ class CogReloader:
                     self.bot.tree.remove_command(cmd_name)
                 self.registered_commands[cog_name].clear()
 
+            # Let the previous instance release its resources before it's replaced
+            if old_cog := self.cogs.get(cog_name):
+                await maybe_coroutine(old_cog.cog_unload)
+
             # Create new cog instance and store commands
             cog = cog_class(self.bot, **kwargs)
             self.registered_commands[cog_name] = {cmd.name for cmd in cog.__cog_app_commands__}
@@ -105,15 +110,15 @@ class CogReloader:
                 await asyncio.sleep(0.5)
 
                 try:
-                    # If this is MusicCog, we want to retain state of MusicCog.currently_playing,
-                    # and MusicCog.queue, and pass both as args to the new instance
+                    # If this is MusicCog, we want to retain state of MusicCog.players,
+                    # and pass it as an arg to the new instance
                     kwargs = {}
                     # if cog_name == "music":
                     #     if music_cog := self.cogs.get("music"):
-                    #         # construct dictionary of args that can be accessed like args.get('currently_playing'):
+                    #         # construct dictionary of args that can be accessed like
+                    #         # args.get('players'):
                     #         kwargs = {
-                    #             "currently_playing": music_cog.currently_playing,
-                    #             "queue": deque(music_cog.queue),
+                    #             "players": music_cog.players,
                     #         }
 
                     await self.load_cog(cog_name, kwargs)
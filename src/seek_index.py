@@ -0,0 +1,128 @@
+"""Timestamp to byte offset indexes of cached Ogg Opus tracks, for seeking without decoding"""
+
+import bisect
+import struct
+from dataclasses import dataclass, field
+
+# Minimum seconds between index entries (seeks land on the entry at or before the target)
+SEEK_INTERVAL = 1.0
+
+# Opus granule positions always count samples at 48 kHz
+OPUS_SAMPLE_RATE = 48_000
+
+# Fixed part of an Ogg page header, up to & including its segment count
+PAGE_HEADER_SIZE = 27
+
+# Set in a page's header type when it starts with the rest of a packet from the page before
+CONTINUED_PACKET = 0x01
+
+
+@dataclass
+class SeekIndex:
+    """Where each page (at least :data:`SEEK_INTERVAL` apart) of a track's audio starts
+
+    A track can be played from any entry by sending FFmpeg the header pages (everything before
+    ``header_size``, i.e. ``OpusHead`` & ``OpusTags``) followed by the data from the entry's
+    offset on, which it reads as a stream that just starts at a later timestamp.
+    """
+
+    header_size: int
+    times: list[float] = field(default_factory=list)
+    offsets: list[int] = field(default_factory=list)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SeekIndex":
+        header_size, *entries = struct.unpack(f"<{len(data) // 4}I", data)
+        return cls(
+            header_size=header_size,
+            times=[millis / 1000 for millis in entries[::2]],
+            offsets=entries[1::2],
+        )
+
+    def to_bytes(self) -> bytes:
+        entries = []
+        for seconds, offset in zip(self.times, self.offsets, strict=True):
+            entries += (round(seconds * 1000), offset)
+        return struct.pack(f"<{1 + len(entries)}I", self.header_size, *entries)
+
+    def locate(self, seconds: float) -> tuple[int, float]:
+        """Find the byte offset to play from to reach ``seconds``, and the time it starts at"""
+        index = bisect.bisect_right(self.times, seconds) - 1
+        if index < 0:
+            return self.header_size, 0.0
+        return self.offsets[index], self.times[index]
+
+
+class SeekIndexBuilder:
+    """Builds a :class:`SeekIndex` from Ogg Opus data as it's written, a page header at a time
+
+    Only page headers are parsed, and page bodies skipped over, so this adds next to nothing
+    to the cost of writing a track.
+    """
+
+    def __init__(self, interval: float = SEEK_INTERVAL):
+        self.interval = interval
+        self.index = SeekIndex(header_size=0)
+        self.valid = True
+        self._offset = 0  # Bytes consumed so far
+        self._page_start = 0
+        self._header = bytearray()
+        self._skip = 0  # Bytes of the current page's body still to skip
+        self._granule = 0  # Granule position at the end of the last page
+
+    def feed(self, data: bytes):
+        view = memoryview(data)
+        while view and self.valid:
+            if self._skip:
+                skipped = min(self._skip, len(view))
+                self._skip -= skipped
+                self._offset += skipped
+                view = view[skipped:]
+                continue
+
+            if not self._header:
+                self._page_start = self._offset
+            # The fixed part first, then the segment table, whose length it ends with
+            needed = PAGE_HEADER_SIZE
+            if len(self._header) >= PAGE_HEADER_SIZE:
+                needed += self._header[PAGE_HEADER_SIZE - 1]
+            taken = min(needed - len(self._header), len(view))
+            self._header += view[:taken]
+            self._offset += taken
+            view = view[taken:]
+            if len(self._header) == needed and (needed > PAGE_HEADER_SIZE or not self._header[-1]):
+                self._end_header()
+
+    def build(self) -> SeekIndex | None:
+        """The index, unless the data wasn't Ogg or had no audio"""
+        if not (self.valid and self.index.offsets):
+            return None
+        return self.index
+
+    def _end_header(self):
+        header = bytes(self._header)
+        self._header.clear()
+        if header[:4] != b"OggS":
+            self.valid = False
+            return
+
+        header_type = header[5]
+        (granule,) = struct.unpack_from("<q", header, 6)
+        self._skip = sum(header[PAGE_HEADER_SIZE:])
+
+        if granule <= 0:
+            # OpusHead & OpusTags pages have a granule position of 0 (or -1 for a page that
+            # doesn't complete a packet), as does everything before the first audio
+            if not self.index.offsets:
+                self.index.header_size = self._offset + self._skip
+            return
+
+        # A page starts where the one before it ended
+        seconds = self._granule / OPUS_SAMPLE_RATE
+        self._granule = granule
+        if header_type & CONTINUED_PACKET:
+            return  # Can't be played from, as it starts part way through a packet
+        if self.index.times and seconds < self.index.times[-1] + self.interval:
+            return
+        self.index.times.append(seconds)
+        self.index.offsets.append(self._page_start)
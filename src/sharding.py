@@ -0,0 +1,92 @@
+"""Running the bot as several processes, each connecting its own subset of shards"""
+
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from src.disk_cache import DISK_CACHE_DIR, DISK_CACHE_SIZE
+from src.metrics import METRICS_PORT
+
+log = logging.getLogger(__name__)
+
+# Number of bot processes to run. With more than one, `python -m src.main` supervises them
+SHARD_PROCESSES = int(os.getenv("SHARD_PROCESSES", "1"))
+
+# Total number of shards across all processes (defaults to one per process)
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None
+
+# Seconds to wait before restarting a process that exited on its own
+RESTART_DELAY = 5
+
+
+def shard_ids_from_env() -> list[int] | None:
+    """Shards this process connects, as assigned by the supervisor (``None`` for all)"""
+    if shard_ids := os.getenv("SHARD_IDS"):
+        return [int(shard_id) for shard_id in shard_ids.split(",")]
+    return None
+
+
+def is_supervisor() -> bool:
+    return SHARD_PROCESSES > 1 and shard_ids_from_env() is None
+
+
+class Supervisor:
+    """Starts one bot process per group of shards, restarting any that exit on their own
+
+    Shards are spread round-robin over the processes. Each process shares the Redis cache
+    and database with the rest, but gets its own disk cache directory (with an equal share
+    of the disk budget) and metrics port, since those are owned by a single process.
+    """
+
+    def __init__(self, processes: int = SHARD_PROCESSES, shard_count: int | None = SHARD_COUNT):
+        self.processes = processes
+        self.shard_count = max(shard_count or processes, processes)
+        self.children: dict[int, subprocess.Popen] = {}
+        self.stopping = False
+
+    def run(self):
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._stop)
+
+        log.info(f"Starting {self.processes} processes for {self.shard_count} shards")
+        for index in range(self.processes):
+            self._start(index)
+
+        while self.children:
+            time.sleep(1)
+            for index, child in list(self.children.items()):
+                if child.poll() is None:
+                    continue
+                del self.children[index]
+                if not self.stopping:
+                    log.error(f"Shard process {index} exited with {child.returncode}, restarting")
+                    time.sleep(RESTART_DELAY)
+                    self._start(index)
+
+        log.info("[bold bright_green]All shard processes stopped[/]")
+
+    def _start(self, index: int):
+        shard_ids = list(range(index, self.shard_count, self.processes))
+        env = {
+            **os.environ,
+            "SHARD_IDS": ",".join(map(str, shard_ids)),
+            "SHARD_COUNT": str(self.shard_count),
+            "DISK_CACHE_DIR": os.path.join(DISK_CACHE_DIR, f"process-{index}"),
+            "DISK_CACHE_MB": str(DISK_CACHE_SIZE // self.processes // 1024 // 1024),
+            "METRICS_PORT": str(METRICS_PORT + index if METRICS_PORT else 0),
+        }
+        # In a session of their own, so that signals reach them only through the supervisor
+        self.children[index] = subprocess.Popen(
+            [sys.executable, "-m", "src.main"], env=env, start_new_session=True
+        )
+        log.info(f"Started shard process {index} for shards {shard_ids}")
+
+    def _stop(self, sig, frame):
+        """Pass the signal on to every process, letting each shut down cleanly"""
+        log.info(f"Received exit signal {signal.Signals(sig).name}, stopping shard processes...")
+        self.stopping = True
+        for child in self.children.values():
+            child.send_signal(sig)
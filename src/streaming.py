@@ -0,0 +1,194 @@
+"""Progressive playback of tracks that are still being written to the cache"""
+
+import asyncio
+import io
+import logging
+import time
+from dataclasses import dataclass
+
+from redis import asyncio as aioredis
+
+log = logging.getLogger(__name__)
+
+# Seconds a track's write progress is kept after its last update
+STREAM_TTL = 60 * 60
+
+# Seconds between progress checks while no notification arrives (e.g. if one was lost)
+STREAM_POLL = 1
+
+# Seconds a progressive reader waits for more audio before giving up on the writer
+STREAM_TIMEOUT = 60
+
+WRITING, DONE, ABORTED = "writing", "done", "aborted"
+
+_watcher: "StreamWatcher | None" = None
+
+
+def stream_key(video_id: str) -> str:
+    """Hash holding a track's write progress, and channel announcing updates to it"""
+    return f"video:{video_id}:stream"
+
+
+def get_stream_watcher(redis: aioredis.Redis) -> "StreamWatcher":
+    """Get the shared watcher, which like the Redis pool outlives cog reloads"""
+    global _watcher
+    if _watcher is None:
+        _watcher = StreamWatcher(redis)
+    return _watcher
+
+
+@dataclass
+class StreamState:
+    """How much of a track has been written so far, and to which file"""
+
+    path: str
+    mime_type: str
+    size: int
+    state: str
+
+    @classmethod
+    def from_redis(cls, data: dict[bytes, bytes]) -> "StreamState | None":
+        if not data:
+            return None
+        return cls(
+            path=data[b"path"].decode(),
+            mime_type=data[b"mime_type"].decode(),
+            size=int(data[b"size"]),
+            state=data[b"state"].decode(),
+        )
+
+    @property
+    def writing(self) -> bool:
+        return self.state == WRITING
+
+    def to_redis(self) -> dict[str, str | int]:
+        return {
+            "path": self.path,
+            "mime_type": self.mime_type,
+            "size": self.size,
+            "state": self.state,
+        }
+
+
+async def publish(redis: aioredis.Redis, video_id: str, state: StreamState):
+    """Record a writer's progress and notify any readers waiting on it"""
+    key = stream_key(video_id)
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hset(key, mapping=state.to_redis())
+        pipe.expire(key, STREAM_TTL)
+        pipe.publish(key, state.size)
+        await pipe.execute()
+
+
+class StreamWatcher:
+    """Waits on the progress of writes, with one subscription shared by every reader"""
+
+    def __init__(self, redis: aioredis.Redis):
+        self.redis = redis
+        self._waiters: dict[str, set[asyncio.Future]] = {}
+        self._listener: asyncio.Task | None = None
+
+    async def get(self, video_id: str) -> StreamState | None:
+        return StreamState.from_redis(await self.redis.hgetall(stream_key(video_id)))
+
+    async def wait(
+        self, video_id: str, size: int, timeout: float = STREAM_POLL
+    ) -> StreamState | None:
+        """Wait for more than ``size`` bytes to be written, or for the write to end
+
+        Returns the latest progress after at most ``timeout`` seconds either way.
+        """
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault(video_id, set())
+        waiters.add(future)
+        try:
+            # Registered first, so an update landing between this check and waiting isn't missed
+            state = await self.get(video_id)
+            if state is None or state.size > size or not state.writing:
+                return state
+            try:
+                await asyncio.wait_for(future, timeout)
+            except TimeoutError:
+                pass
+            return await self.get(video_id)
+        finally:
+            waiters.discard(future)
+            if not waiters and self._waiters.get(video_id) is waiters:
+                del self._waiters[video_id]
+
+    async def _listen(self):
+        try:
+            async with self.redis.pubsub() as pubsub:
+                await pubsub.psubscribe(stream_key("*"))
+                async for message in pubsub.listen():
+                    if message["type"] != "pmessage":
+                        continue
+                    video_id = message["channel"].decode().split(":")[1]
+                    for future in self._waiters.get(video_id, ()):
+                        if not future.done():
+                            future.set_result(None)
+        except Exception as e:
+            # Waiters fall back to polling until the next wait starts listening again
+            log.error(f"Stopped listening for stream updates: {e}")
+
+
+class StreamReader(io.RawIOBase):
+    """Blocking file-like view of a track that's still being written, for progressive playback
+
+    Reads the file the writer is teeing the track to on disk, through a handle that stays
+    valid as the file is committed, moved into another disk cache, or evicted. Whenever the
+    reader catches up with the writer, it waits on the event loop for the next update.
+    """
+
+    def __init__(
+        self,
+        watcher: StreamWatcher,
+        video_id: str,
+        state: StreamState,
+        loop: asyncio.AbstractEventLoop,
+    ):
+        super().__init__()
+        self.watcher = watcher
+        self.video_id = video_id
+        self.state = state
+        self.loop = loop
+        self._position = 0
+        self._file = None
+        # Raises FileNotFoundError if the write was committed since the state was read
+        self._file = open(state.path, "rb")
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        deadline = time.monotonic() + STREAM_TIMEOUT
+        while not self.closed:
+            if self._position < self.state.size:
+                size = self._file.readinto(memoryview(buffer)[: self.state.size - self._position])
+                self._position += size
+                return size
+            if not self.state.writing:
+                if self.state.state == ABORTED:
+                    log.warning(f"Download of video {self.video_id} failed part way")
+                return 0
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out waiting for more audio of video {self.video_id}")
+
+            state = asyncio.run_coroutine_threadsafe(
+                self.watcher.wait(self.video_id, self._position), self.loop
+            ).result()
+            if state is None:
+                return 0  # Progress expired
+            self.state = state
+        return 0
+
+    def close(self):
+        if self._file:
+            self._file.close()
+        super().close()
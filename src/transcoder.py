@@ -0,0 +1,121 @@
+"""One-off conversion of downloaded audio into Discord-ready Ogg Opus"""
+
+import logging
+import subprocess
+import threading
+from collections.abc import Callable, Iterable, Iterator
+
+from src.loudness import EBUR128_FILTER, Loudness
+
+log = logging.getLogger(__name__)
+
+# Bitrate used when a track has to be re-encoded (matches FFmpegOpusAudio's default)
+OPUS_BITRATE = "128k"
+
+# Number of bytes read from FFmpeg's output at a time
+READ_SIZE = 64 * 1024
+
+
+def transcode_to_opus(
+    chunks: Iterable[bytes],
+    passthrough: bool = False,
+    gain: float = 0.0,
+    on_loudness: Callable[[Loudness], None] | None = None,
+) -> Iterator[bytes]:
+    """Convert streamed audio to Ogg Opus, yielding output as FFmpeg produces it
+
+    Input is fed to FFmpeg from a separate thread while output is read on the caller's, so the
+    conversion runs alongside the download and neither side is ever held in full.
+
+    :param chunks: Source audio, in any container/codec FFmpeg understands
+    :param passthrough: Source is already Opus (e.g. YouTube's webm streams), so only remux it
+        (unless it has to be re-encoded anyway, to apply a gain)
+    :param gain: Level adjustment (in dB) applied to the output
+    :param on_loudness: Also measure the output's loudness (from the same decode, as a second
+        FFmpeg output), called with the result once the output has all been yielded
+    :raises RuntimeError: If FFmpeg fails
+    """
+    process = subprocess.Popen(
+        _ffmpeg_args(passthrough, gain, measure=on_loudness is not None),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    feed_errors: list[Exception] = []
+    stderr: list[bytes] = []
+    feeder = threading.Thread(
+        target=_feed, args=(process, chunks, feed_errors), name="transcode-feed", daemon=True
+    )
+    feeder.start()
+    # Logging at the info level is enough to fill the pipe, stalling FFmpeg, if not read
+    drainer = threading.Thread(
+        target=stderr.extend, args=(process.stderr,), name="transcode-log", daemon=True
+    )
+    drainer.start()
+    try:
+        while data := process.stdout.read(READ_SIZE):
+            yield data
+
+        feeder.join()
+        if feed_errors:
+            raise feed_errors[0]
+        returncode = process.wait()
+        drainer.join()
+        log_text = b"".join(stderr).decode(errors="replace").strip()
+        if returncode != 0:
+            raise RuntimeError(f"FFmpeg failed to transcode audio: {log_text}")
+
+        if on_loudness:
+            if loudness := Loudness.from_ebur128(log_text):
+                on_loudness(loudness)
+            else:
+                log.warning("FFmpeg didn't report the loudness of transcoded audio")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        drainer.join()
+        process.stdout.close()
+        process.stderr.close()
+
+
+def _ffmpeg_args(passthrough: bool, gain: float, measure: bool) -> list[str]:
+    filters = [f"volume={gain:.2f}dB"] if gain else []
+    if passthrough and not gain:
+        codec_args = ["-c:a", "copy"]
+    else:
+        codec_args = ["-c:a", "libopus", "-b:a", OPUS_BITRATE, "-ar", "48000", "-ac", "2"]
+        if filters:
+            codec_args += ["-af", ",".join(filters)]
+
+    # The measurement (of the audio as it's output) is only logged, as a summary at info level
+    measure_args = []
+    if measure:
+        measure_args = ["-af", ",".join([*filters, EBUR128_FILTER]), "-f", "null", "-"]
+
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-nostats",
+        "-loglevel", "info" if measure else "error",
+        "-i", "pipe:0",
+        "-vn",
+        "-map_metadata", "-1",
+        *codec_args,
+        "-f", "ogg",
+        "pipe:1",
+        *measure_args,
+    ]  # fmt: skip
+
+
+def _feed(process: subprocess.Popen, chunks: Iterable[bytes], errors: list[Exception]):
+    """Write the source audio to FFmpeg's stdin (run on a thread of its own)"""
+    try:
+        for chunk in chunks:
+            process.stdin.write(chunk)
+    except BrokenPipeError:
+        pass  # FFmpeg exited early, reported through its return code
+    except Exception as e:
+        errors.append(e)
+    finally:
+        process.stdin.close()
@@ -1,6 +1,7 @@
 """Utility functions"""
 
 import logging
+import math
 from dataclasses import dataclass
 from io import BytesIO
 
@@ -17,12 +18,15 @@ TIME_DURATION_UNITS = (
 )
 
 
-@dataclass
+@dataclass(slots=True)
 class QueueItem:
     video_id: str
     title: str
     requested_by: str
-    url: str
+
+    @property
+    def url(self) -> str:
+        return f"https://youtube.com/watch?v={self.video_id}"
 
 
 def human_time_duration(seconds: int) -> str:
@@ -36,6 +40,33 @@ def human_time_duration(seconds: int) -> str:
     return ", ".join(parts)
 
 
+def parse_timestamp(text: str) -> float:
+    """Parse a position given as ``[[hours:]minutes:]seconds`` into seconds
+
+    :raises ValueError: If it isn't one
+    """
+    parts = text.strip().split(":")
+    if len(parts) > 3:
+        raise ValueError(f"Not a position: {text}")
+    seconds = 0.0
+    for part in parts:
+        value = float(part)
+        if not math.isfinite(value):
+            raise ValueError(f"Not a position: {text}")  # float() takes "nan" & "inf" too
+        if value < 0:
+            # Checked per part, as e.g. "1:-30" would otherwise add up to a valid position
+            raise ValueError(f"Negative position: {text}")
+        seconds = seconds * 60 + value
+    return seconds
+
+
+def format_timestamp(seconds: float) -> str:
+    """Format seconds as ``[hours:]minutes:seconds``"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes}:{seconds:02}"
+
+
 async def download_image_from_url(url: str) -> BytesIO | None:
     """Asynchronously downloads an image from a URL and returns it as a file-like object.
 
@@ -0,0 +1,74 @@
+"""Warming the cache with the most played tracks after a restart"""
+
+import asyncio
+import logging
+import os
+from datetime import timedelta
+
+from src.cache import AudioCache
+from src.downloader import Downloader
+from src.history import PlayHistory
+
+log = logging.getLogger(__name__)
+
+# Number of most played tracks to warm on startup
+WARMUP_TRACKS = int(os.getenv("WARMUP_TRACKS", "50"))
+
+# Only plays within this many days count towards a track's popularity
+WARMUP_WINDOW = timedelta(days=int(os.getenv("WARMUP_WINDOW_DAYS", "30")))
+
+# Seconds to wait between warm-up downloads, leaving the download workers free for users
+WARMUP_INTERVAL = float(os.getenv("WARMUP_INTERVAL", "5"))
+
+# Seconds to wait after startup before warming, so logging in & restoring players go first
+WARMUP_DELAY = 10
+
+
+class CacheWarmer:
+    """Makes sure the most played tracks are cached, in the background and one at a time
+
+    Tracks that are still cached (on either tier) are touched, while the rest are downloaded
+    again, with :data:`WARMUP_INTERVAL` seconds between downloads.
+    """
+
+    def __init__(self, cache: AudioCache, downloader: Downloader, history: PlayHistory):
+        self.cache = cache
+        self.downloader = downloader
+        self.history = history
+        self._task: asyncio.Task | None = None
+
+    def start(self, limit: int = WARMUP_TRACKS):
+        if limit and not (self._task and not self._task.done()):
+            self._task = asyncio.create_task(self._run(limit))
+
+    def cancel(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self, limit: int):
+        await asyncio.sleep(WARMUP_DELAY)
+        most_played = await self.history.most_played(limit, since=WARMUP_WINDOW)
+        video_ids = [video_id for video_id, _ in most_played]
+        log.info(f"Warming cache with the {len(video_ids)} most played tracks")
+
+        downloaded = 0
+        for video_id in video_ids:
+            try:
+                manifest = await self.cache.get_manifest(video_id)
+                if manifest and await self.cache.touch(video_id, manifest):
+                    continue
+                if manifest:
+                    await self.cache.evict(video_id)  # Partially evicted
+
+                url = f"https://youtube.com/watch?v={video_id}"
+                await self.downloader.download(video_id, url)
+                await self.cache.metadata.get(video_id, url)
+                downloaded += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error(f"Warm-up failed for video {video_id}: {e}")
+            await asyncio.sleep(WARMUP_INTERVAL)
+
+        log.info(f"Cache warm-up done, downloaded {downloaded}/{len(video_ids)} tracks")
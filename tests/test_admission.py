@@ -0,0 +1,54 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from src.admission import INDEX_KEY, AdmissionPolicy
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def policy(monkeypatch) -> AdmissionPolicy:
+    redis = fakeredis.FakeAsyncRedis()
+    policy = AdmissionPolicy(redis)
+
+    # fakeredis has neither INFO nor BITFIELD_RO, so memory use & request counts are faked
+    async def info(section: str) -> dict:
+        cached = await redis.zrange(INDEX_KEY, 0, -1, withscores=True, score_cast_func=int)
+        return {"used_memory": sum(size for _, size in cached), "maxmemory": 100 * MB}
+
+    frequencies = {"popular": 10, "rare": 1}
+
+    async def estimate(*video_ids: str) -> list[int]:
+        return [frequencies.get(video_id, 0) for video_id in video_ids]
+
+    monkeypatch.setattr(redis, "info", info)
+    monkeypatch.setattr(policy.sketch, "estimate", estimate)
+    return policy
+
+
+def admit(policy: AdmissionPolicy, cached: dict[str, int], video_id: str, size: int):
+    """Fill the index with ``cached`` videos (and their sizes), then try admitting a video"""
+
+    async def run():
+        await policy.redis.zadd(INDEX_KEY, cached)
+        return await policy.admit(video_id, size)
+
+    return asyncio.run(run())
+
+
+def test_admits_everything_with_room(policy):
+    assert admit(policy, {"cached": 10 * MB}, "rare", 5 * MB) == []
+
+
+def test_evicts_less_requested_when_full(policy):
+    cached = {f"cached-{i}": 10 * MB for i in range(10)}
+    victims = admit(policy, cached, "popular", 15 * MB)
+    assert len(victims) == 2
+    assert set(victims) <= cached.keys()
+
+
+def test_rejects_less_requested_when_full(policy):
+    cached = {f"cached-{i}": 10 * MB for i in range(10)}
+    assert admit(policy, cached, "unknown", 5 * MB) is None
@@ -0,0 +1,34 @@
+import os
+import time
+
+from src.disk_cache import PARTIAL_SUFFIX, DiskCache, DiskInbox
+
+
+def test_adopting_leaves_the_track_in_the_inbox(tmp_path):
+    inbox = DiskInbox(str(tmp_path / "inbox"))
+    (inbox.directory / "video.ogg").write_bytes(b"audio")
+    shards = [
+        DiskCache(str(tmp_path / f"shard-{i}"), 1024, inbox=str(inbox.directory)) for i in range(2)
+    ]
+
+    for disk in shards:
+        assert disk.adopt("video") == []
+        assert disk.read("video", 0, 5) == b"audio"
+    assert (inbox.directory / "video.ogg").exists()
+    assert shards[0].adopt("missing") is None
+
+
+def test_inbox_is_pruned_by_age_then_size(tmp_path):
+    inbox = DiskInbox(str(tmp_path), max_size=10, retention=60)
+    now = time.time()
+    for name, age in [("expired.ogg", 120), ("old.ogg", 30), ("new.ogg", 10)]:
+        path = tmp_path / name
+        path.write_bytes(b"x" * 6)
+        os.utime(path, (now - age, now - age))
+    (tmp_path / f"writing.ogg{PARTIAL_SUFFIX}").write_bytes(b"x" * 6)
+
+    inbox.prune()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "new.ogg",
+        f"writing.ogg{PARTIAL_SUFFIX}",
+    ]
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+import fakeredis
+import pytest
+
+from src.cache import AudioCache
+from src.disk_cache import DiskInbox
+from src.ingest import HEARTBEAT_KEY, PROCESSING_KEY, QUEUE_KEY, IngestWorker
+
+
+@pytest.fixture
+def cache(tmp_path) -> AudioCache:
+    redis = fakeredis.FakeAsyncRedis()
+    return AudioCache(pool=redis.connection_pool, disk=DiskInbox(str(tmp_path)))
+
+
+async def take_job(worker: IngestWorker) -> bytes:
+    """Take a job off the queue as the worker does, without running it"""
+    await worker._beat()
+    return await worker.cache.redis.lmove(
+        QUEUE_KEY, PROCESSING_KEY.format(worker_id=worker.id), src="RIGHT", dest="LEFT"
+    )
+
+
+def test_restarted_worker_requeues_jobs_lost_in_crash(cache):
+    async def run():
+        job = json.dumps({"video_id": "crashed", "url": "https://youtu.be/crashed"})
+        await cache.redis.lpush(QUEUE_KEY, job)
+        crashed = IngestWorker(cache, concurrency=1)
+        assert await take_job(crashed) == job.encode()
+
+        # Restarted in the same container, i.e. with the same hostname & pid
+        restarted = IngestWorker(cache, concurrency=1)
+        assert restarted.id != crashed.id
+        await restarted._beat()
+
+        # Left alone until the crashed worker's heartbeat lapses
+        await restarted._recover()
+        assert await cache.redis.llen(QUEUE_KEY) == 0
+
+        await cache.redis.delete(HEARTBEAT_KEY.format(worker_id=crashed.id))
+        await restarted._recover()
+        assert await cache.redis.lrange(QUEUE_KEY, 0, -1) == [job.encode()]
+        assert not await cache.redis.exists(PROCESSING_KEY.format(worker_id=crashed.id))
+
+        crashed.downloader.shutdown()
+        restarted.downloader.shutdown()
+
+    asyncio.run(run())
+
+
+def test_live_worker_keeps_its_jobs(cache):
+    async def run():
+        await cache.redis.lpush(QUEUE_KEY, json.dumps({"video_id": "live", "url": ""}))
+        busy = IngestWorker(cache, concurrency=1)
+        await take_job(busy)
+
+        other = IngestWorker(cache, concurrency=1)
+        await other._recover()
+        assert await cache.redis.llen(QUEUE_KEY) == 0
+        assert await cache.redis.llen(PROCESSING_KEY.format(worker_id=busy.id)) == 1
+
+        busy.downloader.shutdown()
+        other.downloader.shutdown()
+
+    asyncio.run(run())
@@ -0,0 +1,70 @@
+import struct
+
+import pytest
+
+from src.seek_index import CONTINUED_PACKET, OPUS_SAMPLE_RATE, SeekIndex, SeekIndexBuilder
+
+# Seconds of audio in each synthetic page
+PAGE_DURATION = 0.5
+
+
+def ogg_page(body: bytes, granule: int, header_type: int = 0) -> bytes:
+    """An Ogg page (with a dummy CRC, which the builder doesn't check)"""
+    lacing = [255] * (len(body) // 255) + [len(body) % 255]
+    return (
+        struct.pack("<4sBBqIIIB", b"OggS", 0, header_type, granule, 1, 0, 0, len(lacing))
+        + bytes(lacing)
+        + body
+    )
+
+
+@pytest.fixture(scope="module")
+def track() -> tuple[bytes, int, list[int]]:
+    """A track with header pages and 0.5s audio pages, one of which continues a packet
+
+    :returns: The data, where its header pages end, and where each audio page starts
+    """
+    data = ogg_page(b"OpusHead" + bytes(11), 0) + ogg_page(b"OpusTags" + bytes(300), 0)
+    header_size = len(data)
+    offsets = []
+    for i in range(8):
+        offsets.append(len(data))
+        granule = round((i + 1) * PAGE_DURATION * OPUS_SAMPLE_RATE)
+        header_type = CONTINUED_PACKET if i == 6 else 0
+        data += ogg_page(bytes([i]) * (100 + i * 400), granule, header_type)
+    return data, header_size, offsets
+
+
+@pytest.mark.parametrize("feed_size", [1, 7, 27, 28, 512, 1024 * 1024])
+def test_builder_indexes_pages_at_least_interval_apart(track, feed_size):
+    data, header_size, offsets = track
+    builder = SeekIndexBuilder(interval=1.0)
+    for start in range(0, len(data), feed_size):
+        builder.feed(data[start : start + feed_size])
+
+    index = builder.build()
+    assert index.header_size == header_size
+    # The page starting at 3s continues a packet, so the one after it is indexed instead
+    assert index.times == [0.0, 1.0, 2.0, 3.5]
+    assert index.offsets == [offsets[0], offsets[2], offsets[4], offsets[7]]
+
+
+def test_builder_rejects_non_ogg_data():
+    builder = SeekIndexBuilder()
+    builder.feed(b"ID3" + bytes(100))
+    assert builder.build() is None
+
+
+def test_builder_needs_audio_pages():
+    builder = SeekIndexBuilder()
+    builder.feed(ogg_page(b"OpusHead" + bytes(11), 0))
+    assert builder.build() is None
+
+
+def test_index_round_trips_and_locates():
+    index = SeekIndex(header_size=100, times=[0.0, 1.0, 2.5], offsets=[100, 900, 2000])
+    assert SeekIndex.from_bytes(index.to_bytes()) == index
+    assert index.locate(-1) == (100, 0.0)
+    assert index.locate(0.5) == (100, 0.0)
+    assert index.locate(2.5) == (2000, 2.5)
+    assert index.locate(60) == (2000, 2.5)
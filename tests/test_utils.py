@@ -0,0 +1,22 @@
+import pytest
+
+from src.utils import format_timestamp, parse_timestamp
+
+
+@pytest.mark.parametrize(
+    "text, seconds",
+    [("90", 90.0), ("1:30", 90.0), (" 1:02:03.5 ", 3723.5), ("0:00", 0.0)],
+)
+def test_parse_timestamp(text, seconds):
+    assert parse_timestamp(text) == seconds
+
+
+@pytest.mark.parametrize("text", ["", "abc", "1:-30", "-1:30", "-5", "nan", "1:inf", "1:2:3:4"])
+def test_parse_timestamp_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        parse_timestamp(text)
+
+
+def test_format_timestamp_round_trips():
+    for seconds in (0, 59, 61, 3599, 3723):
+        assert parse_timestamp(format_timestamp(seconds)) == seconds